@@ -1,6 +1,7 @@
 import json
 import os
 import ssl
+from functools import lru_cache
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -20,8 +21,19 @@ CLIENT_LOG_LEVEL = os.getenv("CLIENT_LOG_LEVEL", "error" if IS_PRODUCTION else "
 # Brain API Configuration
 BRAIN_API_BASE_URL = os.getenv("BRAIN_API_BASE_URL", "https://ews-emea.api.bosch.com:443/it/application/dia-brain/v1/api")
 BRAIN_PORTAL_URL = os.getenv("BRAIN_PORTAL_URL", "https://brain.prd.dia-apps.bosch.tech/brains/oXV4pyZVEJvy")
-
-
+# Explicit outbound proxy for Brain / token calls (local VPN only; ignored in
+# production for the same reason main.py strips the *_PROXY env vars). The
+# shared clients do not read proxy env vars themselves (trust_env=False), so
+# HTTPS_PROXY is folded in here once.
+BRAIN_PROXY = None if IS_PRODUCTION else (
+    os.getenv("BRAIN_PROXY") or os.getenv("HTTPS_PROXY") or os.getenv("https_proxy") or None
+)
+# Client-side caps on outgoing Brain calls (in-flight requests / request starts per minute)
+BRAIN_MAX_CONCURRENT = int(os.getenv("BRAIN_MAX_CONCURRENT", "16"))
+BRAIN_MAX_RPM = int(os.getenv("BRAIN_MAX_RPM", "300"))
+
+
+@lru_cache(maxsize=1)
 def get_ssl_context():
     """Build an SSL context for outgoing HTTPS requests.
 
@@ -31,8 +43,11 @@ def get_ssl_context():
     ``SSL_VERIFY=false`` **only** in trusted dev environments behind VPN.
 
     Returns ``ssl.SSLContext | bool``:
-      - In production: always a proper SSLContext (with optional custom CA).
       - In dev with ``SSL_VERIFY=false``: returns ``False`` (disables verification).
+      - Otherwise: a proper SSLContext (custom CA if configured, else certifi).
+
+    The result is memoised: the CA bundle is read once per process instead of
+    on every outgoing request.
     """
     if os.getenv("SSL_VERIFY", "true").lower() == "false" and not IS_PRODUCTION:
         return False
@@ -42,7 +57,11 @@ def get_ssl_context():
         ctx = ssl.create_default_context(cafile=ca_bundle)
         return ctx
 
-    return True
+    # Same trust store httpx uses for verify=True, but built once and shared
+    # so new clients do not reload the certifi bundle.
+    import certifi
+
+    return ssl.create_default_context(cafile=certifi.where())
 
 
 def get_object_store_config() -> dict:
@@ -12,7 +12,11 @@ if os.getenv("ENVIRONMENT", "dev").lower() == "prod":
     for _key in ("HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy"):
         os.environ.pop(_key, None)
 
+import atexit
 import logging
+import logging.handlers
+import queue
+import re
 
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
@@ -24,10 +28,6 @@ import secrets
 import sys
 from urllib.parse import quote
 
-logger = logging.getLogger(__name__)
-
-import re
-
 from app.core.config import APP_TITLE, STATIC_DIR, TEMPLATES_DIR
 from app.routers import pages, api
 from app.services.auth_service import (
@@ -36,7 +36,41 @@ from app.services.auth_service import (
     get_logout_url,
     get_xsuaa_config,
     validate_token,
+    resolve_static_callback_urls,
+    load_token_keys,
 )
+from app.services.brain_auth import close_auth_client
+from app.services.common_service import close_brain_client, get_brain_client
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_app_logging() -> None:
+    """Route ``app.*`` loggers through a QueueHandler.
+
+    Request handlers only enqueue records; a background QueueListener thread
+    does the formatting and the blocking write to stderr, so logging never
+    stalls the event loop.
+    """
+    app_logger = logging.getLogger("app")
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in app_logger.handlers):
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    app_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    app_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    # Records are written once, here; root/uvicorn handlers never see app.*
+    # records (see docs/09-deployment.md, Observability).
+    app_logger.propagate = False
+
+
+_configure_app_logging()
 
 
 _is_prod = bool(os.getenv("VCAP_SERVICES")) or os.getenv("ENVIRONMENT") == "prod"
@@ -50,16 +84,28 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
-    """Print startup information and verify configuration."""
-    print("=" * 50)
-    print(f"Starting {APP_TITLE}")
+    """Log startup information and verify configuration."""
+    logger.info("Starting %s", APP_TITLE)
     
     config = get_xsuaa_config()
     if config:
-        print(f"XSUAA configured: client_id={bool(config.get('client_id'))}, auth_url={config.get('auth_url')}")
+        logger.info("XSUAA configured: client_id=%s, auth_url=%s", bool(config.get("client_id")), config.get("auth_url"))
+        await load_token_keys()
     else:
-        print("WARNING: XSUAA not configured - auth will be bypassed")
-    print("=" * 50)
+        logger.warning("XSUAA not configured - auth will be bypassed")
+
+    app.state.callback_urls = resolve_static_callback_urls(app.url_path_for("auth_callback"))
+
+    # Build the pooled Brain client on the server's event loop so it lives
+    # exactly once per process, from startup to the shutdown hook below.
+    get_brain_client()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled outbound HTTP clients."""
+    await close_brain_client()
+    await close_auth_client()
 
 
 
@@ -2,6 +2,7 @@
 from __future__ import annotations
 import asyncio
 import json
+import logging
 import os
 import re
 from typing import Any, Optional, List
@@ -72,8 +73,11 @@ async def client_log(payload: ClientLogRequest, request: Request):
     path = _LOG_SANITIZE_RE.sub('', payload.path or request.url.path)[:500]
     metadata = _LOG_SANITIZE_RE.sub('', payload.metadata or '')[:2000] if payload.metadata else None
     ip = request.client.host if request.client else "unknown"
-    print(f"[CLIENT][{level}] {path} {message} | ip={ip}")
+    # The frontend already filters by CLIENT_LOG_LEVEL, so whatever it sends is
+    # written at INFO or above; the client's own level stays in the message.
+    log_level = max(logging.INFO, getattr(logging, level, logging.ERROR))
+    logger.log(log_level, "[CLIENT][%s] %s %s | ip=%s", level, path, message, ip)
     if metadata:
-        print(f"[CLIENT][META] {metadata}")
+        logger.log(log_level, "[CLIENT][META] %s", metadata)
     return {"status": "ok"}
 
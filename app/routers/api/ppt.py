@@ -180,8 +180,6 @@ class PptDownloadRequest(BaseModel):
 @router.post("/ppt/download")
 async def ppt_download(data: PptDownloadRequest):
     """Generate and download the .pptx file from structured AI content."""
-    from fastapi.responses import StreamingResponse
-
     content = data.content
     username = data.username
 
@@ -202,8 +200,8 @@ async def ppt_download(data: PptDownloadRequest):
         filename = f"{safe}.pptx"
         asyncio.create_task(track_download("ppt"))
 
-        return StreamingResponse(
-            buf,
+        return Response(
+            content=buf.getvalue(),
             media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
             headers={"Content-Disposition": f'attachment; filename="{filename}"'},
         )
@@ -313,8 +311,6 @@ class PptHistoryDownloadRequest(BaseModel):
 @router.post("/ppt/history/{gen_id}/download")
 async def ppt_history_download(gen_id: str, data: PptHistoryDownloadRequest, request: Request):
     """Re-generate and stream a .pptx from a stored generation."""
-    from fastapi.responses import StreamingResponse
-
     try:
         _validate_gen_id(gen_id)
     except ValueError:
@@ -331,8 +327,8 @@ async def ppt_history_download(gen_id: str, data: PptHistoryDownloadRequest, req
         safe = "".join(c if c.isalnum() or c in "_-" else "" for c in title) or "Presentation"
         asyncio.create_task(track_download("ppt"))
 
-        return StreamingResponse(
-            buf,
+        return Response(
+            content=buf.getvalue(),
             media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
             headers={"Content-Disposition": f'attachment; filename="{safe}.pptx"'},
         )
@@ -86,8 +86,6 @@ class FSExportRequest(BaseModel):
 @router.post("/export-functional-spec")
 async def export_functional_spec(data: FSExportRequest):
     """Generate a .docx Functional Specification document from form data."""
-    from fastapi.responses import StreamingResponse
-
     try:
         buffer = generate_functional_spec_docx(data.dict())
         safe_title = "".join(c if c.isalnum() or c in "_ -" else "" for c in data.title).replace(" ", "_") or "Functional_Spec"
@@ -95,8 +93,8 @@ async def export_functional_spec(data: FSExportRequest):
 
         asyncio.create_task(track_generation("spec-builder"))
         asyncio.create_task(track_download("spec-builder"))
-        return StreamingResponse(
-            buffer,
+        return Response(
+            content=buffer.getvalue(),
             media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             headers={"Content-Disposition": f'attachment; filename="{filename}"'},
         )
@@ -131,8 +129,6 @@ class BRExportRequest(BaseModel):
 @router.post("/export-business-requirement")
 async def export_business_requirement(data: BRExportRequest):
     """Generate a .docx Business Requirement document from form data."""
-    from fastapi.responses import StreamingResponse
-
     try:
         buffer = generate_br_docx(data.model_dump())
         title = data.title or "Business_Requirement"
@@ -141,8 +137,8 @@ async def export_business_requirement(data: BRExportRequest):
 
         asyncio.create_task(track_generation("spec-builder"))
         asyncio.create_task(track_download("spec-builder"))
-        return StreamingResponse(
-            buffer,
+        return Response(
+            content=buffer.getvalue(),
             media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             headers={"Content-Disposition": f'attachment; filename="{filename}"'},
         )
@@ -196,8 +192,6 @@ class FSVariantExportRequest(BaseModel):
 @router.post("/export-fs-variant")
 async def export_fs_variant(data: FSVariantExportRequest):
     """Generate a .docx FS Template (variant) document from form data."""
-    from fastapi.responses import StreamingResponse
-
     try:
         buffer = generate_fs_variant_docx(data.model_dump())
         safe_title = "".join(c if c.isalnum() or c in "_ -" else "" for c in data.description).replace(" ", "_") or "FS_Template"
@@ -205,8 +199,8 @@ async def export_fs_variant(data: FSVariantExportRequest):
 
         asyncio.create_task(track_generation("spec-builder"))
         asyncio.create_task(track_download("spec-builder"))
-        return StreamingResponse(
-            buffer,
+        return Response(
+            content=buffer.getvalue(),
             media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             headers={"Content-Disposition": f'attachment; filename="{filename}"'},
         )
@@ -6,7 +6,7 @@ import os
 from typing import Optional, List
 from fastapi import UploadFile
 from app.services.common_service import (
-    create_chat_history,
+    start_chat_turn,
     upload_attachments,
     call_brain_workflow_chat,
     sanitize_filename_for_prompt,
@@ -33,7 +33,7 @@ async def check_audit_document(file: UploadFile) -> dict:
             "detail": "AUDIT_CHECK_BRAIN_ID is not configured."
         }
 
-    chat_result = await create_chat_history(brain_id)
+    chat_result, upload_result = await start_chat_turn(brain_id, [file])
     if chat_result.get("error"):
         return chat_result
 
@@ -46,7 +46,6 @@ async def check_audit_document(file: UploadFile) -> dict:
             "detail": "Chat history ID is empty or null."
         }
 
-    upload_result = await upload_attachments(brain_id, [file])
     if upload_result.get("error"):
         return upload_result
 
@@ -6,6 +6,7 @@ import os
 import json
 import logging
 import secrets
+from functools import lru_cache
 from urllib.parse import urlencode
 from fastapi import HTTPException, Request, Response
 from fastapi.responses import RedirectResponse
@@ -16,6 +17,10 @@ logger = logging.getLogger(__name__)
 # Lazy loading for SAP libraries to handle import errors gracefully
 xssec = None
 AppEnv = None
+pyjwt = None
+
+# XSUAA signing keys keyed by ``kid``; filled once at startup by load_token_keys()
+_token_keys: dict = {}
 
 def _load_sap_libs():
     """Lazily load SAP libraries."""
@@ -32,8 +37,26 @@ def _load_sap_libs():
     return True
 
 
+def _load_pyjwt():
+    """Lazily load PyJWT for the local token validation fast path."""
+    global pyjwt
+    if pyjwt is None:
+        try:
+            import jwt as _jwt
+            pyjwt = _jwt
+        except ImportError as e:
+            logger.warning("PyJWT not available, using xssec for token validation: %s", e)
+            return False
+    return True
+
+
+@lru_cache(maxsize=1)
 def _get_uaa_service():
-    """Get UAA service credentials lazily."""
+    """Get UAA service credentials lazily.
+
+    VCAP_SERVICES is fixed for the lifetime of a Cloud Foundry app instance,
+    so the bound service is resolved once and reused.
+    """
     if not _load_sap_libs():
         return None
     
@@ -56,8 +79,12 @@ def _get_uaa_service():
         return None
 
 
+@lru_cache(maxsize=1)
 def get_xsuaa_config():
-    """Get XSUAA OAuth2 configuration from VCAP_SERVICES."""
+    """Get XSUAA OAuth2 configuration from VCAP_SERVICES.
+
+    Built once per process; callers must treat the returned dict as read-only.
+    """
     uaa_service = _get_uaa_service()
     if not uaa_service:
         logger.warning("UAA service not available")
@@ -76,19 +103,54 @@ def get_xsuaa_config():
             "auth_url": f"{url}/oauth/authorize",
             "token_url": f"{url}/oauth/token",
             "logout_url": f"{url}/logout",
+            "token_keys_url": f"{url}/token_keys",
             "xsappname": creds.get("xsappname"),
+            "identity_zone_id": creds.get("identityzoneid") or creds.get("zoneid"),
         }
     except Exception as e:
         logger.error("Error reading XSUAA config: %s", type(e).__name__)
         return None
 
 
+def resolve_static_callback_urls(callback_path: str) -> dict[str, str]:
+    """
+    Resolve the callback URL for every route bound in VCAP_APPLICATION.
+    The result maps each route's host to its HTTPS callback URL and is
+    stored on ``app.state`` at startup. An app may be bound to several
+    routes (custom domain, blue/green), and the session cookie holding
+    ``oauth_state`` is scoped to the host the user came in on, so the
+    callback must stay on that host. Returns an empty dict when not
+    running on CF (local dev falls back to per-request resolution).
+    """
+    vcap_raw = os.getenv("VCAP_APPLICATION")
+    if not vcap_raw:
+        return {}
+    try:
+        uris = json.loads(vcap_raw).get("application_uris") or []
+    except json.JSONDecodeError:
+        logger.warning("VCAP_APPLICATION is not valid JSON")
+        return {}
+    urls = {}
+    for uri in uris:
+        host = uri.split("/", 1)[0].lower()
+        urls.setdefault(host, f"https://{uri}{callback_path}")
+    return urls
+
+
 def _get_callback_url(request: Request) -> str:
     """
     Build the callback URL, ensuring HTTPS is used in production.
-    Cloud Foundry apps are behind a load balancer, so we need to check
-    the X-Forwarded-Proto header.
+    Uses the URL precomputed at startup for the request's host when that
+    host is a bound route. Otherwise, Cloud Foundry apps are behind a
+    load balancer, so we need to check the X-Forwarded-Proto header.
     """
+    cached = getattr(request.app.state, "callback_urls", None)
+    if cached:
+        host = request.headers.get("host", "").lower()
+        url = cached.get(host)
+        if url:
+            return url
+
     callback_url = str(request.url_for("auth_callback"))
     
     # Check if we're behind a proxy (Cloud Foundry)
@@ -170,8 +232,87 @@ async def exchange_code_for_token(code: str, request: Request) -> dict:
         raise HTTPException(status_code=500, detail="Token exchange request failed")
 
 
+async def load_token_keys() -> None:
+    """Fetch the XSUAA signing keys once so tokens can be validated locally."""
+    import httpx
+
+    config = get_xsuaa_config()
+    if not config or not _load_pyjwt():
+        return
+
+    try:
+        async with httpx.AsyncClient(verify=get_ssl_context(), timeout=30.0) as client:
+            response = await client.get(config["token_keys_url"])
+            response.raise_for_status()
+            jwks = response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Could not load XSUAA token keys: %s", type(e).__name__)
+        return
+
+    keys = {}
+    for jwk in jwks.get("keys", []):
+        kid = jwk.get("kid")
+        if not kid:
+            continue
+        try:
+            keys[kid] = pyjwt.PyJWK(jwk).key
+        except pyjwt.PyJWTError as e:
+            logger.warning("Skipping unusable XSUAA token key: %s", type(e).__name__)
+    _token_keys.clear()
+    _token_keys.update(keys)
+    logger.info("Loaded %s XSUAA token key(s)", len(keys))
+
+
+def _validate_token_locally(token: str) -> dict | None:
+    """Verify the JWT signature against the cached XSUAA keys.
+
+    Returns user info on success, or None when the fast path cannot decide
+    (no cached key for the token's ``kid`` or the token was rejected) so the
+    caller can fall back to xssec. XSUAA signing keys are shared across a
+    landscape, so besides signature, ``exp`` and ``aud`` the token must be
+    issued by this binding's UAA (``iss``) for its identity zone (``zid``).
+    """
+    if not _token_keys or pyjwt is None:
+        return None
+
+    config = get_xsuaa_config()
+    if not config:
+        return None
+
+    try:
+        kid = pyjwt.get_unverified_header(token).get("kid")
+        key = _token_keys.get(kid)
+        if key is None:
+            return None
+        audience = [aud for aud in (config.get("client_id"), config.get("xsappname")) if aud]
+        claims = pyjwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=audience or None,
+            issuer=config["token_url"],
+            options={"require": ["exp", "iss"]},
+        )
+    except pyjwt.InvalidTokenError:
+        return None
+
+    zone_id = config.get("identity_zone_id")
+    if zone_id and claims.get("zid") != zone_id:
+        return None
+
+    return {
+        "user": claims.get("user_name") or "Unknown",
+        "email": claims.get("email") or "",
+        "scopes": claims.get("scope") or [],
+    }
+
+
 def validate_token(token: str) -> dict:
     """Validate JWT token with XSUAA and return user info."""
+    user_info = _validate_token_locally(token)
+    if user_info:
+        return user_info
+
     uaa_service = _get_uaa_service()
     if not uaa_service:
         raise HTTPException(status_code=500, detail="XSUAA service not configured")
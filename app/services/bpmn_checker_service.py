@@ -6,8 +6,7 @@ import os
 from typing import Optional
 from fastapi import UploadFile
 from app.services.common_service import (
-    create_chat_history,
-    upload_attachments,
+    start_chat_turn,
     call_brain_workflow_chat,
     sanitize_filename_for_prompt,
 )
@@ -26,12 +25,17 @@ BPMN_DIAGRAM_CHECK_BEHAVIOUR = (
 )
 
 
+_CHECKER_PROMPT_HEAD = "Analyze this BPMN diagram for me."
+
+
 def build_checker_prompt(filename: str, context: Optional[str] = None) -> str:
     """Build a minimal analysis prompt; workflow behavior defines output shape."""
-    base = "Analyze this BPMN diagram for me."
-    details = f" File: {sanitize_filename_for_prompt(filename)}." if filename else ""
-    extra = f" Context: {context}" if context else ""
-    return base + details + extra
+    parts = [_CHECKER_PROMPT_HEAD]
+    if filename:
+        parts.append(f" File: {sanitize_filename_for_prompt(filename)}.")
+    if context:
+        parts.append(f" Context: {context}")
+    return "".join(parts)
 
 
 async def check_bpmn_diagram(file: UploadFile, context: Optional[str] = None) -> dict:
@@ -51,7 +55,7 @@ async def check_bpmn_diagram(file: UploadFile, context: Optional[str] = None) ->
 
     await file.seek(0)
 
-    chat_result = await create_chat_history(brain_id)
+    chat_result, upload_result = await start_chat_turn(brain_id, [file])
     if chat_result.get("error"):
         return chat_result
 
@@ -64,8 +68,6 @@ async def check_bpmn_diagram(file: UploadFile, context: Optional[str] = None) ->
             "detail": "Chat history ID is empty or null."
         }
 
-    # Upload the file as an attachment
-    upload_result = await upload_attachments(brain_id, [file])
     if upload_result.get("error"):
         return upload_result
 
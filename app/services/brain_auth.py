@@ -1,23 +1,67 @@
+import asyncio
 import httpx
+import orjson
 import os
 import time
 import logging
 from fastapi import HTTPException
-from app.core.config import get_ssl_context
+from app.core.config import BRAIN_PROXY, get_ssl_context
 
 logger = logging.getLogger(__name__)
 
 _cached_token: str | None = None
 _token_expiry: float = 0.0
+_token_lock = asyncio.Lock()
+_auth_client: httpx.AsyncClient | None = None
+
+
+def _get_auth_client() -> httpx.AsyncClient:
+    """Return the shared client for login.microsoftonline.com, creating it on first use."""
+    global _auth_client
+    if _auth_client is None or _auth_client.is_closed:
+        _auth_client = httpx.AsyncClient(verify=get_ssl_context(), trust_env=False, proxy=BRAIN_PROXY)
+    return _auth_client
+
+
+async def close_auth_client() -> None:
+    """Close the shared token client (called on application shutdown)."""
+    global _auth_client
+    if _auth_client is not None:
+        await _auth_client.aclose()
+        _auth_client = None
 
 
 async def get_brain_access_token():
-    """Returns a cached Bearer token, fetching a new one only when within 5 min of expiry."""
-    global _cached_token, _token_expiry
+    """Returns a cached Bearer token, fetching a new one only when within 5 min of expiry.
 
+    Refreshes are serialised behind a lock so a burst of concurrent requests
+    hitting an expired token triggers a single call to the token endpoint.
+    """
     if _cached_token and time.monotonic() < _token_expiry:
         return _cached_token
 
+    async with _token_lock:
+        # Another coroutine may have refreshed the token while we waited.
+        if _cached_token and time.monotonic() < _token_expiry:
+            return _cached_token
+        return await _fetch_brain_access_token()
+
+
+def invalidate_brain_access_token() -> None:
+    """Drop the cached token so the next call fetches a fresh one.
+
+    Used when the Brain API rejects a cached token (HTTP 401) before its
+    advertised expiry, e.g. after a credential rotation.
+    """
+    global _cached_token, _token_expiry
+    _cached_token = None
+    _token_expiry = 0.0
+
+
+async def _fetch_brain_access_token() -> str:
+    """Request a fresh token from Microsoft and store it in the module cache."""
+    global _cached_token, _token_expiry
+
     tenant_id = os.getenv("BRAIN_TENANT_ID")
     client_id = os.getenv("BRAIN_CLIENT_ID")
     client_secret = os.getenv("BRAIN_CLIENT_SECRET")
@@ -35,28 +79,25 @@ async def get_brain_access_token():
         "grant_type": "client_credentials"
     }
     
-
-    request_kwargs = {
-        "verify": get_ssl_context(),
-        "trust_env": True
-    }
-    
     logger.info("Requesting Brain API access token from Microsoft")
     
-    async with httpx.AsyncClient(**request_kwargs) as client:
-        try:
-            response = await client.post(url, data=data, timeout=30.0)
-            response.raise_for_status()
-            token_data = response.json()
-            token = token_data.get("access_token")
-            expires_in = int(token_data.get("expires_in", 3600))
-            _cached_token = token
-            _token_expiry = time.monotonic() + expires_in - 300
-            logger.info("Successfully obtained Brain API access token")
-            return token
-        except httpx.HTTPStatusError as e:
-            logger.error("Brain authentication failed: HTTP %s", e.response.status_code)
-            raise HTTPException(status_code=502, detail="Brain authentication failed.")
-        except httpx.RequestError as e:
-            logger.error("Could not reach authentication service: %s", type(e).__name__)
-            raise HTTPException(status_code=503, detail="Could not reach the authentication service. Please try again.")
+    client = _get_auth_client()
+    try:
+        response = await client.post(url, data=data, timeout=30.0)
+        response.raise_for_status()
+        token_data = orjson.loads(response.content)
+        token = token_data.get("access_token")
+        expires_in = int(token_data.get("expires_in", 3600))
+        _cached_token = token
+        _token_expiry = time.monotonic() + expires_in - 300
+        logger.info("Successfully obtained Brain API access token")
+        return token
+    except httpx.HTTPStatusError as e:
+        logger.error("Brain authentication failed: HTTP %s", e.response.status_code)
+        raise HTTPException(status_code=502, detail="Brain authentication failed.")
+    except orjson.JSONDecodeError:
+        logger.error("Brain authentication returned a non-JSON body")
+        raise HTTPException(status_code=502, detail="Brain authentication failed.")
+    except httpx.RequestError as e:
+        logger.error("Could not reach authentication service: %s", type(e).__name__)
+        raise HTTPException(status_code=503, detail="Could not reach the authentication service. Please try again.")
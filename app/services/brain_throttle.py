@@ -0,0 +1,113 @@
+"""
+Client-side throttling for outgoing Brain API calls.
+Caps in-flight requests and request starts per minute so a burst of user
+traffic queues locally instead of tripping the gateway's rate limits.
+"""
+import asyncio
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+import httpx
+from app.core.config import BRAIN_MAX_CONCURRENT, BRAIN_MAX_RPM
+
+logger = logging.getLogger(__name__)
+
+# Responses and transport failures that signal an overloaded gateway
+_OVERLOAD_STATUSES = frozenset({429, 502, 503})
+_OVERLOAD_ERRORS = (httpx.NetworkError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+class SlidingWindowLimiter:
+    """Allow at most ``rpm`` request starts in any rolling window."""
+
+    __slots__ = ("rpm", "window_seconds", "_starts", "_lock")
+
+    def __init__(self, rpm: int, window_seconds: float = 60.0):
+        self.rpm = rpm
+        self.window_seconds = window_seconds
+        self._starts: deque[float] = deque()
+        self._lock = asyncio.Lock()
+
+    async def wait_if_throttled(self) -> None:
+        """Sleep until a request may start, then record the start time.
+
+        Waiters are served one at a time behind the lock, so throttled calls
+        are released in arrival order.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._starts and now - self._starts[0] >= self.window_seconds:
+                    self._starts.popleft()
+                if len(self._starts) < self.rpm:
+                    self._starts.append(now)
+                    return
+                delay = self.window_seconds - (now - self._starts[0])
+                logger.warning("Brain API rate limit reached (%s/min), waiting %.1fs", self.rpm, delay)
+                await asyncio.sleep(delay)
+
+
+class AdmissionController:
+    """Concurrency limit that adapts to gateway health (AIMD).
+
+    The limit grows by ``alpha`` after each healthy call, up to ``c_max``,
+    and is multiplied by ``beta`` (down to ``c_min``) whenever a call hits
+    an overload signal. Latency is deliberately not used as a signal: Brain
+    response times are dominated by generation length, not gateway load.
+    """
+
+    __slots__ = ("c_min", "c_max", "alpha", "beta", "limit", "_in_flight", "_cond")
+
+    def __init__(self, c_max: int, c_min: int = 1, alpha: float = 0.5, beta: float = 0.5):
+        self.c_min = c_min
+        self.c_max = c_max
+        self.alpha = alpha
+        self.beta = beta
+        self.limit = float(c_max)
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def release(self, overloaded: bool) -> None:
+        async with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                self.limit = max(float(self.c_min), self.limit * self.beta)
+                logger.warning("Brain API overloaded, concurrency limit lowered to %d", int(self.limit))
+            else:
+                self.limit = min(float(self.c_max), self.limit + self.alpha)
+            self._cond.notify_all()
+
+
+def _is_overload(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in _OVERLOAD_STATUSES
+    return isinstance(exc, _OVERLOAD_ERRORS)
+
+
+_admission = AdmissionController(BRAIN_MAX_CONCURRENT)
+_limiter = SlidingWindowLimiter(BRAIN_MAX_RPM)
+
+
+@asynccontextmanager
+async def brain_call_slot():
+    """Hold a concurrency slot and a rate-limit token for one Brain API call.
+
+    Call ``raise_for_status()`` inside the block so error responses feed
+    back into the adaptive concurrency limit.
+    """
+    await _admission.acquire()
+    overloaded = False
+    try:
+        await _limiter.wait_if_throttled()
+        yield
+    except Exception as e:
+        overloaded = _is_overload(e)
+        raise
+    finally:
+        await _admission.release(overloaded)
@@ -2,16 +2,19 @@
 Common service utilities shared across all Brain-based features.
 Contains chat history, file uploads, and API calling functions.
 """
+import asyncio
 import httpx
+import orjson
 import os
+import random
 import re
 import logging
-from typing import Optional, List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, List, Dict
 from fastapi import HTTPException, UploadFile
-from app.services.brain_auth import get_brain_access_token
-from app.core.config import BRAIN_API_BASE_URL, get_ssl_context
-
-logger = logging.getLogger(__name__)
+from app.services.brain_auth import get_brain_access_token, invalidate_brain_access_token
+from app.services.brain_throttle import brain_call_slot
+from app.core.config import BRAIN_API_BASE_URL, BRAIN_PROXY, get_ssl_context
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,9 @@ _SAFE_FILENAME_RE = re.compile(r'[^a-zA-Z0-9._\- ]')
 _MAX_PDF_CHARS = 90000
 _MIN_MEANINGFUL_CHARS = 80
 
+# PyMuPDF is not thread-safe, so all PDF parsing shares one worker thread.
+_PDF_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-extract")
+
 
 def extract_pdf_text(pdf_bytes: bytes) -> tuple[str | None, str | None]:
     """Extract text from a PDF using PyMuPDF (fitz).
@@ -67,6 +73,18 @@ def extract_pdf_text(pdf_bytes: bytes) -> tuple[str | None, str | None]:
         return None, "Could not extract text from the PDF. Please ensure the file is a valid, text-based PDF."
 
 
+async def extract_pdf_texts(pdf_bytes_list: List[bytes]) -> list[tuple[str | None, str | None]]:
+    """Run extract_pdf_text for several PDFs off the event loop.
+
+    Results are returned in input order, one (text, error) pair per PDF.
+    """
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(
+        loop.run_in_executor(_PDF_EXECUTOR, extract_pdf_text, pdf_bytes)
+        for pdf_bytes in pdf_bytes_list
+    ))
+
+
 def sanitize_filename_for_prompt(filename: str) -> str:
     """Strip dangerous characters from a filename before embedding it in a prompt."""
     if not filename:
@@ -75,6 +93,61 @@ def sanitize_filename_for_prompt(filename: str) -> str:
     return name[:200] or "uploaded_file"
 
 
+_JSON_FENCE_RE = re.compile(r"```(?:json)?")
+
+
+def _iter_json_objects(text: str):
+    """Yield each top-level balanced ``{...}`` span in text, left to right.
+
+    Braces inside JSON string literals are ignored. A single linear pass,
+    unlike a greedy DOTALL regex that backtracks over malformed responses.
+    """
+    depth = 0
+    start = 0
+    in_string = escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif depth:
+            if ch == '"':
+                in_string = True
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    yield text[start:i + 1]
+
+
+def parse_ai_json(text: str) -> dict:
+    """Parse the JSON object in an AI response, tolerating code fences and surrounding prose.
+
+    Returns {} when no JSON object can be decoded.
+    """
+    cleaned = _JSON_FENCE_RE.sub("", text or "").strip().rstrip("`").strip()
+    if not cleaned:
+        return {}
+
+    try:
+        return orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
+        pass
+
+    for candidate in _iter_json_objects(cleaned):
+        try:
+            return orjson.loads(candidate)
+        except orjson.JSONDecodeError:
+            continue
+    return {}
+
+
 def _require_env(value: str, name: str) -> str:
     """Validate required environment variable."""
     if not value:
@@ -85,7 +158,8 @@ def _require_env(value: str, name: str) -> str:
 def _friendly_http_error(e: "httpx.HTTPStatusError", context: str = "AI service") -> dict:
     status_code = e.response.status_code
     logger.error("%s returned HTTP %s", context, status_code)
-    logger.error("%s returned HTTP %s", context, status_code)
+    if status_code == 401:
+        invalidate_brain_access_token()
 
     messages = {
         400: ("Invalid Request", "The request was rejected by the AI service. Please check your inputs and try again."),
@@ -105,91 +179,316 @@ def _friendly_http_error(e: "httpx.HTTPStatusError", context: str = "AI service"
     return {"error": True, "message": title, "detail": detail}
 
 
-def _get_base_url_and_headers(token: str) -> Tuple[str, dict]:
-    base_url = BRAIN_API_BASE_URL
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "User-Agent": "PostmanRuntime/7.37.3",
-        "Content-Type": "application/json"
+_brain_client: Optional[httpx.AsyncClient] = None
+
+
+def get_brain_client() -> httpx.AsyncClient:
+    """Return the process-wide Brain API client, creating it on first use.
+
+    Sharing one client keeps TCP/TLS connections to the Brain host alive
+    across calls instead of paying a new handshake per request. HTTP/2 lets
+    the create-history / upload / chat sequence share one connection; httpx
+    falls back to HTTP/1.1 keep-alive if the server does not negotiate it.
+    """
+    global _brain_client
+    if _brain_client is None or _brain_client.is_closed:
+        _brain_client = httpx.AsyncClient(
+            verify=get_ssl_context(),
+            trust_env=False,
+            proxy=BRAIN_PROXY,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=300.0),
+            timeout=httpx.Timeout(120.0),
+            headers={"User-Agent": "PostmanRuntime/7.37.3"},
+        )
+    return _brain_client
+
+
+async def close_brain_client() -> None:
+    """Close the shared Brain API client (called on application shutdown)."""
+    global _brain_client
+    if _brain_client is not None:
+        await _brain_client.aclose()
+        _brain_client = None
+
+
+# Endpoint URLs are fixed for the life of the process; build them once.
+_CHAT_HISTORIES_URL = f"{BRAIN_API_BASE_URL}/chat-histories"
+_CHAT_ATTACHMENTS_URL = f"{BRAIN_API_BASE_URL}/chat-attachments"
+_CHAT_WORKFLOW_URL = f"{BRAIN_API_BASE_URL}/chat/workflow"
+_CHAT_PURE_LLM_URL = f"{BRAIN_API_BASE_URL}/chat/pure-llm"
+
+
+def _auth_header(token: str) -> dict:
+    """Per-call headers; User-Agent is a client default and body headers are passed by the caller."""
+    return {"Authorization": f"Bearer {token}"}
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+# Transient failures worth retrying: gateway throttling/overload and
+# connections that dropped before a response arrived. 504 and read timeouts
+# are not retried - they mean a full generation already timed out.
+_RETRY_STATUSES = frozenset({429, 502, 503})
+_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+# Non-idempotent calls (new chat histories, attachment uploads, chat turns)
+# may already have been processed after a 502/503 or a dropped connection, so
+# they only retry when the request provably never reached the backend.
+_SAFE_RETRY_STATUSES = frozenset({429})
+_SAFE_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+_MAX_ATTEMPTS = 3
+_RETRY_BASE_SECONDS = 1.0
+_RETRY_MAX_WAIT_SECONDS = 10.0
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Seconds to wait before the next attempt, honouring a numeric Retry-After."""
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    if retry_after.isdigit():
+        return min(_RETRY_MAX_WAIT_SECONDS, float(retry_after))
+    return min(_RETRY_MAX_WAIT_SECONDS, _RETRY_BASE_SECONDS * 2 ** attempt) + random.uniform(0, 0.5)
+
+
+async def _post_with_retry(
+    client: httpx.AsyncClient, url: str, *, idempotent: bool = True, **kwargs
+) -> httpx.Response:
+    """POST through the throttle, retrying rate-limit and transient errors.
+
+    With ``idempotent=False`` only 429 and connect-phase errors are retried.
+    Returns the successful response. Once attempts are exhausted, or for
+    non-retryable failures, the HTTPStatusError/RequestError is re-raised.
+    """
+    retry_statuses = _RETRY_STATUSES if idempotent else _SAFE_RETRY_STATUSES
+    retry_errors = _RETRY_ERRORS if idempotent else _SAFE_RETRY_ERRORS
+    for attempt in range(_MAX_ATTEMPTS):
+        try:
+            async with brain_call_slot():
+                response = await client.post(url, **kwargs)
+                response.raise_for_status()
+            return response
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in retry_statuses or attempt == _MAX_ATTEMPTS - 1:
+                raise
+            delay = _retry_delay(attempt, e.response)
+            reason = f"HTTP {e.response.status_code}"
+        except retry_errors as e:
+            if attempt == _MAX_ATTEMPTS - 1:
+                raise
+            delay = _retry_delay(attempt)
+            reason = type(e).__name__
+        logger.warning("Brain API %s (attempt %d/%d), retrying in %.1fs", reason, attempt + 1, _MAX_ATTEMPTS, delay)
+        await asyncio.sleep(delay)
+
+
+_CONNECTION_ERROR = {
+    "error": True,
+    "message": "Connection Error",
+    "detail": "Could not connect to the AI service. Please check your network and try again.",
+}
+
+
+async def _brain_post(
+    url: str,
+    parse: Callable[[httpx.Response], dict],
+    *,
+    context: str,
+    timeout_seconds: float,
+    headers: Optional[dict] = None,
+    report_timeout: bool = False,
+    status_errors: Optional[Dict[int, dict]] = None,
+    idempotent: bool = True,
+    **request_kwargs,
+) -> dict:
+    """POST to a Brain endpoint and normalise the outcome into a result dict.
+
+    Resolves the token, sends the request through the throttle and retry
+    loop, and hands a successful response to ``parse``. Failures become the
+    standard ``{"error": True, "message": ..., "detail": ...}`` dict.
+
+    Args:
+        url: One of the precomputed endpoint URLs.
+        parse: Builds the caller's result dict from a successful response.
+        context: Caller name used in log lines and error reporting.
+        headers: Extra headers merged over the Authorization header.
+        report_timeout: Return a dedicated timeout message instead of the
+            generic connection error when the request times out.
+        status_errors: Per-status error dicts that override _friendly_http_error.
+        idempotent: False for calls that create state or run a generation;
+            those are not retried once the request may have been processed.
+        **request_kwargs: Request body arguments for httpx (content, data, files).
+    """
+    _require_env(BRAIN_API_BASE_URL, "BRAIN_API_BASE_URL")
+    token = await get_brain_access_token()
+    request_headers = _auth_header(token)
+    if headers:
+        request_headers.update(headers)
+
+    try:
+        response = await _post_with_retry(
+            get_brain_client(),
+            url,
+            idempotent=idempotent,
+            headers=request_headers,
+            timeout=timeout_seconds,
+            **request_kwargs,
+        )
+        result = parse(response)
+        logger.info("%s successful", context)
+        return result
+    except httpx.TimeoutException:
+        logger.error("%s timeout after %s seconds", context, timeout_seconds)
+        if not report_timeout:
+            return dict(_CONNECTION_ERROR)
+        return {
+            "error": True,
+            "message": "Request Timed Out",
+            "detail": f"The AI service took too long to respond (timeout: {timeout_seconds}s). Try reducing file size or simplifying your request.",
+        }
+    except httpx.HTTPStatusError as e:
+        status_code = e.response.status_code
+        if status_errors and status_code in status_errors:
+            logger.error("%s HTTP error: %s - %s", context, status_code, e.response.text[:200])
+            return dict(status_errors[status_code])
+        return _friendly_http_error(e, context)
+    except httpx.RequestError as e:
+        logger.error("%s connection error: %s", context, str(e))
+        return dict(_CONNECTION_ERROR)
+
+
+def _parse_chat_history(response: httpx.Response) -> dict:
+    # The body is a bare JSON string; trim it as bytes instead of decoding via .text first.
+    return {"chatHistoryId": response.content.strip().strip(b'"').decode("utf-8")}
+
+
+def _parse_attachments(response: httpx.Response) -> dict:
+    return {"attachmentIds": orjson.loads(response.content)}
+
+
+def _parse_chat_result(response: httpx.Response, payload: dict) -> dict:
+    data = orjson.loads(response.content)
+    return {
+        "result": data.get("result", ""),
+        "chatHistoryId": data.get("chatHistoryId", payload.get("chatHistoryId")),
     }
-    
-    return base_url, headers
 
 
 async def create_chat_history(brain_id: str) -> dict:
     """Create an empty chat history for a given knowledgeBaseId."""
     _require_env(brain_id, "knowledgeBaseId")
     logger.info("Creating chat history for brain_id: %s", brain_id[:8] + "...")
-    
-    token = await get_brain_access_token()
-    base_url, headers = _get_base_url_and_headers(token)
-    _require_env(base_url, "BRAIN_API_BASE_URL")
-    
-    url = f"{base_url}/chat-histories/{brain_id}"
-    
-    client_kwargs = {"verify": get_ssl_context(), "trust_env": True}
-    
-    async with httpx.AsyncClient(**client_kwargs) as client:
-        try:
-            response = await client.post(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            chat_history_id = response.text.strip().strip('"')
-            logger.info("Chat history created successfully: %s", chat_history_id[:16] + "...")
-            return {"chatHistoryId": chat_history_id}
-        except httpx.HTTPStatusError as e:
-            logger.error("Failed to create chat history: HTTP %s", e.response.status_code)
-            return _friendly_http_error(e, "create_chat_history")
-        except httpx.RequestError as e:
-            logger.error("Connection error creating chat history: %s", str(e))
-            return {
-                "error": True,
-                "message": "Connection Error",
-                "detail": "Could not connect to the AI service. Please check your network and try again.",
-            }
+
+    return await _brain_post(
+        f"{_CHAT_HISTORIES_URL}/{brain_id}",
+        _parse_chat_history,
+        context="create_chat_history",
+        timeout_seconds=30.0,
+        headers=_JSON_HEADERS,
+        idempotent=False,
+    )
+
+
+def _raise_first_exception(results) -> None:
+    """Re-raise the first exception from a ``gather(..., return_exceptions=True)``."""
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
 
 
 async def upload_attachments(brain_id: str, files: List[UploadFile]) -> dict:
-    """Upload files as attachments for a knowledge base and return their IDs."""
+    """Upload files as attachments for a knowledge base and return their IDs.
+
+    Each file is sent in its own request and the uploads run concurrently
+    (bounded by the Brain throttle), so a transient failure retries one
+    file instead of the whole batch. IDs are returned in input order.
+    """
     _require_env(brain_id, "knowledgeBaseId")
-    
-    token = await get_brain_access_token()
-    base_url, _ = _get_base_url_and_headers(token)
-    _require_env(base_url, "BRAIN_API_BASE_URL")
-    
-    url = f"{base_url}/chat-attachments"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "User-Agent": "PostmanRuntime/7.37.3"
+
+    # Let every upload settle before rewinding: a plain gather would return on
+    # the first exception while sibling uploads are still reading their files.
+    results = await asyncio.gather(
+        *(_upload_attachment(brain_id, file) for file in files),
+        return_exceptions=True,
+    )
+    await asyncio.gather(*(file.seek(0) for file in files))
+    _raise_first_exception(results)
+
+    attachment_ids = []
+    for result in results:
+        if result.get("error"):
+            return result
+        attachment_ids.extend(result["attachmentIds"])
+    return {"attachmentIds": attachment_ids}
+
+
+async def _upload_attachment(brain_id: str, file: UploadFile) -> dict:
+    # Hand httpx the spooled file object so the multipart body is streamed
+    # in chunks instead of copying the upload into memory first.
+    return await _brain_post(
+        _CHAT_ATTACHMENTS_URL,
+        _parse_attachments,
+        context="upload_attachments",
+        timeout_seconds=60.0,
+        idempotent=False,
+        data={"knowledgeBaseId": brain_id},
+        files=[("files", (file.filename, file.file, file.content_type))],
+    )
+
+
+async def start_chat_turn(brain_id: str, files: Optional[List[UploadFile]] = None) -> tuple[dict, dict]:
+    """Create a chat history and upload the first turn's attachments concurrently.
+
+    The two calls are independent, so a new session pays one round trip
+    instead of two. Returns ``(chat_result, upload_result)`` exactly as
+    create_chat_history / upload_attachments would; without files the upload
+    result is an empty attachment list.
+
+    Because the upload does not wait for the chat history, attachments are
+    still uploaded when history creation fails. They are then never
+    referenced by a chat turn and stay orphaned in the knowledge base; callers
+    report the chat error and drop the attachment IDs. Both calls always run
+    to completion before an exception is raised, so no upload keeps reading
+    the request's files after this returns.
+    """
+    if not files:
+        return await create_chat_history(brain_id), {"attachmentIds": []}
+    results = await asyncio.gather(
+        create_chat_history(brain_id),
+        upload_attachments(brain_id, files),
+        return_exceptions=True,
+    )
+    _raise_first_exception(results)
+    chat_result, upload_result = results
+    return chat_result, upload_result
+
+
+# Friendlier messages for the pure LLM endpoint, which mostly serves diagram/vision requests
+_PURE_LLM_STATUS_ERRORS = {
+    504: {
+        "error": True,
+        "message": "Gateway Timeout",
+        "detail": "The AI service took too long while processing this diagram. This usually happens with dense or highly detailed images. Try a cleaner crop, a straighter screenshot, or split the diagram into smaller sections.",
+    },
+    503: {
+        "error": True,
+        "message": "AI Service Unavailable",
+        "detail": "The AI service is temporarily unavailable. Please try again in a few minutes.",
+    },
+    502: {
+        "error": True,
+        "message": "Upstream Service Error",
+        "detail": "The AI service returned an invalid response while processing the diagram. Please try again.",
+    },
+}
+
+
+def _build_chat_payload(prompt: str, brain_id: str, **optional) -> dict:
+    """Build a chat request body in one dict; optional fields are sent only when truthy."""
+    return {
+        "prompt": prompt,
+        "knowledgeBaseId": brain_id,
+        **{key: value for key, value in optional.items() if value},
     }
-    
-    files_data = []
-    for file in files:
-        content = await file.read()
-        files_data.append(("files", (file.filename, content, file.content_type)))
-        await file.seek(0)
-    
-    client_kwargs = {"verify": get_ssl_context(), "trust_env": True}
-    
-    async with httpx.AsyncClient(**client_kwargs) as client:
-        try:
-            response = await client.post(
-                url,
-                headers=headers,
-                data={"knowledgeBaseId": brain_id},
-                files=files_data,
-                timeout=60.0
-            )
-            response.raise_for_status()
-            attachment_ids = response.json()
-            return {"attachmentIds": attachment_ids}
-        except httpx.HTTPStatusError as e:
-            return _friendly_http_error(e, "upload_attachments")
-        except httpx.RequestError as e:
-            return {
-                "error": True,
-                "message": "Connection Error",
-                "detail": "Could not connect to the AI service. Please check your network and try again.",
-            }
 
 
 async def call_brain_workflow_chat(
@@ -211,43 +510,24 @@ async def call_brain_workflow_chat(
     """
     _require_env(brain_id, "knowledgeBaseId")
 
-    token = await get_brain_access_token()
-    base_url, headers = _get_base_url_and_headers(token)
-    _require_env(base_url, "BRAIN_API_BASE_URL")
-
-    url = f"{base_url}/chat/workflow"
-    payload = {
-        "prompt": prompt,
-        "knowledgeBaseId": brain_id,
-    }
-    if chat_history_id:
-        payload["chatHistoryId"] = chat_history_id
-    if attachment_ids:
-        payload["attachmentIds"] = attachment_ids
-    if custom_behaviour:
-        payload["customMessageBehaviour"] = custom_behaviour
-    if workflow_id:
-        payload["workflowId"] = workflow_id
-
-    client_kwargs = {"verify": get_ssl_context(), "trust_env": True}
-
-    async with httpx.AsyncClient(**client_kwargs) as client:
-        try:
-            response = await client.post(url, json=payload, headers=headers, timeout=120.0)
-            response.raise_for_status()
-            data = response.json()
-            return {
-                "result": data.get("result", ""),
-                "chatHistoryId": data.get("chatHistoryId", chat_history_id)
-            }
-        except httpx.HTTPStatusError as e:
-            return _friendly_http_error(e, "call_brain_workflow_chat")
-        except httpx.RequestError as e:
-            return {
-                "error": True,
-                "message": "Connection Error",
-                "detail": "Could not connect to the AI service. Please check your network and try again.",
-            }
+    payload = _build_chat_payload(
+        prompt,
+        brain_id,
+        chatHistoryId=chat_history_id,
+        attachmentIds=attachment_ids,
+        customMessageBehaviour=custom_behaviour,
+        workflowId=workflow_id,
+    )
+
+    return await _brain_post(
+        _CHAT_WORKFLOW_URL,
+        lambda response: _parse_chat_result(response, payload),
+        context="call_brain_workflow_chat",
+        timeout_seconds=120.0,
+        headers=_JSON_HEADERS,
+        idempotent=False,
+        content=orjson.dumps(payload),
+    )
 
 
 async def call_brain_pure_llm_chat(
@@ -270,67 +550,22 @@ async def call_brain_pure_llm_chat(
     logger.info("Calling Brain pure LLM chat: brain_id=%s, chat_history=%s, attachments=%s, timeout=%ss",
                brain_id[:8] + "...", bool(chat_history_id), len(attachment_ids) if attachment_ids else 0, timeout_seconds)
 
-    token = await get_brain_access_token()
-    base_url, headers = _get_base_url_and_headers(token)
-    _require_env(base_url, "BRAIN_API_BASE_URL")
-
-    url = f"{base_url}/chat/pure-llm"
-    payload = {
-        "prompt": prompt,
-        "knowledgeBaseId": brain_id,
-    }
-    if chat_history_id:
-        payload["chatHistoryId"] = chat_history_id
-    if attachment_ids:
-        payload["attachmentIds"] = attachment_ids
-    if custom_behaviour:
-        payload["customMessageBehaviour"] = custom_behaviour
-
-    client_kwargs = {"verify": get_ssl_context(), "trust_env": True}
-
-    async with httpx.AsyncClient(**client_kwargs) as client:
-        try:
-            response = await client.post(url, json=payload, headers=headers, timeout=timeout_seconds)
-            response.raise_for_status()
-            data = response.json()
-            logger.info("Brain API call successful")
-            return {
-                "result": data.get("result", ""),
-                "chatHistoryId": data.get("chatHistoryId", chat_history_id),
-            }
-        except httpx.TimeoutException as e:
-            logger.error("Brain API timeout after %s seconds", timeout_seconds)
-            return {
-                "error": True,
-                "message": "Request Timed Out",
-                "detail": f"The AI service took too long to respond (timeout: {timeout_seconds}s). Try reducing file size or simplifying your request.",
-            }
-        except httpx.HTTPStatusError as e:
-            status_code = e.response.status_code
-            logger.error("Brain API HTTP error: %s - %s", status_code, e.response.text[:200])
-            if status_code == 504:
-                return {
-                    "error": True,
-                    "message": "Gateway Timeout",
-                    "detail": "The AI service took too long while processing this diagram. This usually happens with dense or highly detailed images. Try a cleaner crop, a straighter screenshot, or split the diagram into smaller sections.",
-                }
-            if status_code == 503:
-                return {
-                    "error": True,
-                    "message": "AI Service Unavailable",
-                    "detail": "The AI service is temporarily unavailable. Please try again in a few minutes.",
-                }
-            if status_code == 502:
-                return {
-                    "error": True,
-                    "message": "Upstream Service Error",
-                    "detail": "The AI service returned an invalid response while processing the diagram. Please try again.",
-                }
-            return _friendly_http_error(e, "call_brain_pure_llm_chat")
-        except httpx.RequestError as e:
-            logger.error("Brain API connection error: %s", str(e))
-            return {
-                "error": True,
-                "message": "Connection Error",
-                "detail": "Could not connect to the AI service. Please check your network and try again.",
-            }
+    payload = _build_chat_payload(
+        prompt,
+        brain_id,
+        chatHistoryId=chat_history_id,
+        attachmentIds=attachment_ids,
+        customMessageBehaviour=custom_behaviour,
+    )
+
+    return await _brain_post(
+        _CHAT_PURE_LLM_URL,
+        lambda response: _parse_chat_result(response, payload),
+        context="call_brain_pure_llm_chat",
+        timeout_seconds=timeout_seconds,
+        report_timeout=True,
+        status_errors=_PURE_LLM_STATUS_ERRORS,
+        headers=_JSON_HEADERS,
+        idempotent=False,
+        content=orjson.dumps(payload),
+    )
@@ -3,6 +3,7 @@ Confluence Builder Service.
 Generates Confluence storage-format drafts from uploaded files and publishes them
 to Confluence using a Personal Access Token.
 """
+import asyncio
 import io
 import json
 import logging
@@ -17,10 +18,10 @@ from fastapi import UploadFile
 from app.core.config import get_ssl_context
 from app.services.common_service import (
     call_brain_pure_llm_chat,
-    create_chat_history,
-    upload_attachments,
-    extract_pdf_text,
+    start_chat_turn,
+    extract_pdf_texts,
     sanitize_filename_for_prompt,
+    parse_ai_json,
 )
 
 
@@ -361,26 +362,6 @@ def draft_file_plan_from_draft(draft: dict[str, Any]) -> list[dict[str, Any]]:
     return file_plan
 
 
-def _parse_ai_json(text: str) -> dict[str, Any]:
-    cleaned = re.sub(r"```(?:json)?", "", text or "").strip().rstrip("`").strip()
-    if not cleaned:
-        return {}
-
-    try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
-        pass
-
-    match = re.search(r"\{.*\}", cleaned, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
-            return {}
-
-    return {}
-
-
 def _default_summary(file_plan: list[dict[str, Any]]) -> str:
     ai_count = sum(1 for item in file_plan if item.get("useForAi"))
     attachment_count = sum(1 for item in file_plan if item.get("attachToPage"))
@@ -552,21 +533,24 @@ async def generate_confluence_builder_draft(
     pdf_blocks: list[str] = []
     extraction_errors: list[str] = []
     image_ai_sources: list[UploadFile] = []
+    pdf_sources: list[tuple[dict, bytes]] = []
 
     for file, item in zip(files, file_plan):
         if not item["useForAi"]:
             continue
         if item["isPdf"]:
-            file_bytes = await file.read()
-            text, error = extract_pdf_text(file_bytes)
+            pdf_sources.append((item, await file.read()))
             await file.seek(0)
-            if error:
-                extraction_errors.append(f"{item['originalName']}: {error}")
-            elif text:
-                pdf_blocks.append(f"=== File: {sanitize_filename_for_prompt(item['originalName'])} ===\n{text}")
         elif item["isImage"]:
             image_ai_sources.append(file)
 
+    extracted = await extract_pdf_texts([file_bytes for _, file_bytes in pdf_sources])
+    for (item, _), (text, error) in zip(pdf_sources, extracted):
+        if error:
+            extraction_errors.append(f"{item['originalName']}: {error}")
+        elif text:
+            pdf_blocks.append(f"=== File: {sanitize_filename_for_prompt(item['originalName'])} ===\n{text}")
+
     if extraction_errors and not image_ai_sources and not pdf_blocks:
         return {
             "error": True,
@@ -575,7 +559,7 @@ async def generate_confluence_builder_draft(
             "detail": " ".join(extraction_errors),
         }
 
-    chat_result = await create_chat_history(brain_id)
+    chat_result, upload_result = await start_chat_turn(brain_id, image_ai_sources)
     if chat_result.get("error"):
         return {
             "error": True,
@@ -585,18 +569,15 @@ async def generate_confluence_builder_draft(
         }
 
     chat_history_id = chat_result.get("chatHistoryId")
-    attachment_ids = None
 
-    if image_ai_sources:
-        upload_result = await upload_attachments(brain_id, image_ai_sources)
-        if upload_result.get("error"):
-            return {
-                "error": True,
-                "status_code": 500,
-                "message": upload_result.get("message", "Image upload failed"),
-                "detail": upload_result.get("detail", "Could not upload image sources."),
-            }
-        attachment_ids = upload_result.get("attachmentIds")
+    if upload_result.get("error"):
+        return {
+            "error": True,
+            "status_code": 500,
+            "message": upload_result.get("message", "Image upload failed"),
+            "detail": upload_result.get("detail", "Could not upload image sources."),
+        }
+    attachment_ids = upload_result.get("attachmentIds") or None
 
     prompt = _build_generate_prompt(
         requested_title=requested_title.strip(),
@@ -620,7 +601,7 @@ async def generate_confluence_builder_draft(
             "detail": response.get("detail", "The AI service could not generate the Confluence draft."),
         }
 
-    parsed = _parse_ai_json(response.get("result", ""))
+    parsed = parse_ai_json(response.get("result", ""))
     if not parsed:
         return {
             "error": True,
@@ -685,7 +666,7 @@ async def refine_confluence_builder_draft(
             "detail": response.get("detail", "The AI service could not refine the Confluence draft."),
         }
 
-    parsed = _parse_ai_json(response.get("result", ""))
+    parsed = parse_ai_json(response.get("result", ""))
     if not parsed:
         return {
             "error": True,
@@ -788,30 +769,32 @@ async def verify_confluence_connection(
         logger.info("[verify] Authenticated as: %s", user_data)
         display_name = user_data.get("displayName") or user_data.get("username") or "Unknown"
 
-        # 2. Verify space key
+        # 2./3. Verify space key and parent page - independent, so fetched together.
+        # Results are still checked in order so the reported error is unchanged.
         space_url = f"{base}/rest/api/space/{space_key}"
-        try:
-            logger.info("[verify] GET %s", space_url)
-            space_resp = await client.get(space_url, headers=headers)
-            logger.info("[verify] space status=%s", space_resp.status_code)
-        except Exception as exc:
-            logger.exception("[verify] Error checking space %s", space_key)
-            return {"error": True, "detail": f"Error checking space: {exc}"}
+        page_url = f"{base}/rest/api/content/{parent_page_id}"
+        logger.info("[verify] GET %s", space_url)
+        logger.info("[verify] GET %s", page_url)
+        space_resp, page_resp = await asyncio.gather(
+            client.get(space_url, headers=headers),
+            client.get(page_url, headers=headers),
+            return_exceptions=True,
+        )
+
+        if isinstance(space_resp, Exception):
+            logger.error("[verify] Error checking space %s", space_key, exc_info=space_resp)
+            return {"error": True, "detail": f"Error checking space: {space_resp}"}
+        logger.info("[verify] space status=%s", space_resp.status_code)
 
         if space_resp.is_error:
             body = space_resp.text[:500]
             logger.error("[verify] Space check failed: status=%s body=%s", space_resp.status_code, body)
             return {"error": True, "detail": f"Space '{space_key}' not found (HTTP {space_resp.status_code})."}
 
-        # 3. Verify parent page
-        page_url = f"{base}/rest/api/content/{parent_page_id}"
-        try:
-            logger.info("[verify] GET %s", page_url)
-            page_resp = await client.get(page_url, headers=headers)
-            logger.info("[verify] parent page status=%s", page_resp.status_code)
-        except Exception as exc:
-            logger.exception("[verify] Error checking parent page %s", parent_page_id)
-            return {"error": True, "detail": f"Error checking parent page: {exc}"}
+        if isinstance(page_resp, Exception):
+            logger.error("[verify] Error checking parent page %s", parent_page_id, exc_info=page_resp)
+            return {"error": True, "detail": f"Error checking parent page: {page_resp}"}
+        logger.info("[verify] parent page status=%s", page_resp.status_code)
 
         if page_resp.is_error:
             body = page_resp.text[:500]
@@ -833,6 +816,7 @@ async def verify_confluence_connection(
 
 
 async def _create_confluence_page(
+    client: httpx.AsyncClient,
     *,
     confluence_url: str,
     pat: str,
@@ -854,37 +838,36 @@ async def _create_confluence_page(
         "ancestors": [{"id": str(parent_page_id)}],
         "body": {"storage": {"value": storage_xml, "representation": "storage"}},
     }
-    client_kwargs = {"verify": get_ssl_context(), "trust_env": True}
-
-    async with httpx.AsyncClient(**client_kwargs) as client:
-        response = await client.post(api_url, headers=headers, json=payload, timeout=30.0)
-        if response.is_error:
-            detail = extract_confluence_error_message(response.text, response.status_code)
-            return {
-                "error": True,
-                "status_code": response.status_code,
-                "detail": detail,
-            }
-
-        page_data = response.json()
-        page_id = str(page_data.get("id") or "")
-        version = page_data.get("version", {}).get("number")
-        webui = page_data.get("_links", {}).get("webui", "")
-        base = page_data.get("_links", {}).get("base") or confluence_url.rstrip("/")
-        if webui.startswith("/"):
-            page_link = f"{base}{webui}"
-        else:
-            page_link = webui or f"{confluence_url.rstrip('/')}/pages/viewpage.action?pageId={page_id}"
 
+    response = await client.post(api_url, headers=headers, json=payload, timeout=30.0)
+    if response.is_error:
+        detail = extract_confluence_error_message(response.text, response.status_code)
         return {
-            "id": page_id,
-            "title": page_data.get("title") or title,
-            "version": version,
-            "pageLink": page_link,
+            "error": True,
+            "status_code": response.status_code,
+            "detail": detail,
         }
 
+    page_data = response.json()
+    page_id = str(page_data.get("id") or "")
+    version = page_data.get("version", {}).get("number")
+    webui = page_data.get("_links", {}).get("webui", "")
+    base = page_data.get("_links", {}).get("base") or confluence_url.rstrip("/")
+    if webui.startswith("/"):
+        page_link = f"{base}{webui}"
+    else:
+        page_link = webui or f"{confluence_url.rstrip('/')}/pages/viewpage.action?pageId={page_id}"
+
+    return {
+        "id": page_id,
+        "title": page_data.get("title") or title,
+        "version": version,
+        "pageLink": page_link,
+    }
+
 
 async def _upload_confluence_attachment(
+    client: httpx.AsyncClient,
     *,
     confluence_url: str,
     pat: str,
@@ -899,22 +882,20 @@ async def _upload_confluence_attachment(
         "X-Atlassian-Token": "nocheck",
         "Authorization": f"Bearer {pat}",
     }
-    client_kwargs = {"verify": get_ssl_context(), "trust_env": True}
-
-    async with httpx.AsyncClient(**client_kwargs) as client:
-        response = await client.post(
-            api_url,
-            headers=headers,
-            files={"file": (file_name, file_bytes, content_type or "application/octet-stream")},
-            timeout=60.0,
-        )
-        if response.is_error:
-            return {
-                "success": False,
-                "statusCode": response.status_code,
-                "detail": extract_confluence_error_message(response.text, response.status_code),
-            }
-        return {"success": True}
+
+    response = await client.post(
+        api_url,
+        headers=headers,
+        files={"file": (file_name, file_bytes, content_type or "application/octet-stream")},
+        timeout=60.0,
+    )
+    if response.is_error:
+        return {
+            "success": False,
+            "statusCode": response.status_code,
+            "detail": extract_confluence_error_message(response.text, response.status_code),
+        }
+    return {"success": True}
 
 
 async def publish_confluence_builder_page(
@@ -997,51 +978,56 @@ async def publish_confluence_builder_page(
             "detail": " ".join(unknown_reference_warnings),
         }
 
-    create_result = await _create_confluence_page(
-        confluence_url=normalized_url,
-        pat=pat.strip(),
-        space_key=space_key.strip(),
-        parent_page_id=parent_page_id.strip(),
-        title=title,
-        storage_xml=storage_xml,
-    )
-    if create_result.get("error"):
-        detail = create_result.get("detail", "Confluence page creation failed.")
-        message = "Confluence page creation failed"
-        if "title already exists" in detail.lower():
-            message = "Confluence title conflict"
-        return {
-            "error": True,
-            "status_code": create_result.get("status_code", 500),
-            "message": message,
-            "detail": detail,
-        }
-
-    page_id = create_result["id"]
-    upload_results: list[dict[str, Any]] = []
-
-    for file, item in zip(files, file_plan):
-        if not item.get("attachToPage"):
-            continue
-
-        file_bytes = await file.read()
-        await file.seek(0)
-        upload_result = await _upload_confluence_attachment(
+    # One client for the whole publish so the page create and every attachment
+    # upload reuse the same keep-alive connection to Confluence.
+    async with httpx.AsyncClient(verify=get_ssl_context(), trust_env=True) as client:
+        create_result = await _create_confluence_page(
+            client,
             confluence_url=normalized_url,
             pat=pat.strip(),
-            page_id=page_id,
-            file_name=item["canonicalName"],
-            file_bytes=file_bytes,
-            content_type=file.content_type,
+            space_key=space_key.strip(),
+            parent_page_id=parent_page_id.strip(),
+            title=title,
+            storage_xml=storage_xml,
         )
-        upload_results.append(
-            {
-                "sourceId": item["sourceId"],
-                "originalName": item["originalName"],
-                "uploadedAs": item["canonicalName"],
-                **upload_result,
+        if create_result.get("error"):
+            detail = create_result.get("detail", "Confluence page creation failed.")
+            message = "Confluence page creation failed"
+            if "title already exists" in detail.lower():
+                message = "Confluence title conflict"
+            return {
+                "error": True,
+                "status_code": create_result.get("status_code", 500),
+                "message": message,
+                "detail": detail,
             }
-        )
+
+        page_id = create_result["id"]
+        upload_results: list[dict[str, Any]] = []
+
+        for file, item in zip(files, file_plan):
+            if not item.get("attachToPage"):
+                continue
+
+            file_bytes = await file.read()
+            await file.seek(0)
+            upload_result = await _upload_confluence_attachment(
+                client,
+                confluence_url=normalized_url,
+                pat=pat.strip(),
+                page_id=page_id,
+                file_name=item["canonicalName"],
+                file_bytes=file_bytes,
+                content_type=file.content_type,
+            )
+            upload_results.append(
+                {
+                    "sourceId": item["sourceId"],
+                    "originalName": item["originalName"],
+                    "uploadedAs": item["canonicalName"],
+                    **upload_result,
+                }
+            )
 
     uploaded_count = sum(1 for result in upload_results if result.get("success"))
     failed_uploads = [result for result in upload_results if not result.get("success")]
@@ -11,11 +11,11 @@ import re
 from typing import Optional
 
 from app.services.common_service import (
-    create_chat_history,
+    start_chat_turn,
     call_brain_pure_llm_chat,
-    upload_attachments,
-    extract_pdf_text,
+    extract_pdf_texts,
     sanitize_filename_for_prompt,
+    parse_ai_json,
 )
 
 
@@ -195,37 +195,20 @@ COPY_IMAGE_BEHAVIOUR = (
 )
 
 
-# ─── JSON parsing ────────────────────────────────────────
-
-def _parse_json_response(text: str) -> dict:
-    """Try to parse a JSON object from the AI response."""
-    cleaned = re.sub(r"```(?:json)?", "", text).strip().rstrip("`").strip()
-
-    try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
-        pass
-
-    match = re.search(r"\{.*\}", cleaned, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group())
-        except json.JSONDecodeError:
-            pass
-
-    return {}
+# ─── mxGraph XML extraction ─────────────────────────────
 
+_XML_FENCE_RE = re.compile(r"```(?:xml)?")
+_MXGRAPH_RE = re.compile(r"(<mxGraphModel[\s\S]*?</mxGraphModel>)", re.DOTALL | re.IGNORECASE)
+_NOT_A_DIAGRAM_RE = re.compile(r'\{"not_a_diagram"\s*:\s*true[^}]*\}', re.DOTALL)
 
-# ─── mxGraph XML extraction ─────────────────────────────
 
 def _extract_mxgraph_xml(text: str) -> str:
     """Extract mxGraphModel XML from the AI response."""
     # Remove markdown fences
-    cleaned = re.sub(r"```(?:xml)?", "", text).strip().rstrip("`").strip()
+    cleaned = _XML_FENCE_RE.sub("", text).strip().rstrip("`").strip()
 
     # Try to find <mxGraphModel>...</mxGraphModel>
-    pattern = r"(<mxGraphModel[\s\S]*?</mxGraphModel>)"
-    match = re.search(pattern, cleaned, re.DOTALL | re.IGNORECASE)
+    match = _MXGRAPH_RE.search(cleaned)
     if match:
         return match.group(1).strip()
 
@@ -265,8 +248,8 @@ async def analyze_pdf_content(
 
     all_text_parts: list[str] = []
     errors: list[str] = []
-    for fname, fbytes in pdf_bytes_list:
-        text, err = extract_pdf_text(fbytes)
+    extracted = await extract_pdf_texts([fbytes for _, fbytes in pdf_bytes_list])
+    for (fname, _), (text, err) in zip(pdf_bytes_list, extracted):
         if err:
             errors.append(f"{sanitize_filename_for_prompt(fname)}: {err}")
         elif text:
@@ -301,18 +284,15 @@ async def analyze_pdf_content(
     if user_instructions:
         prompt += f"\n\nAdditional user instructions:\n{user_instructions}"
 
-    chat_result = await create_chat_history(brain_id)
+    chat_result, upload_result = await start_chat_turn(brain_id, image_files if has_images else None)
     if chat_result.get("error"):
         return chat_result
 
     chat_history_id = chat_result.get("chatHistoryId")
 
-    attachment_ids = []
-    if has_images:
-        upload_result = await upload_attachments(brain_id, image_files)
-        if upload_result.get("error"):
-            return upload_result
-        attachment_ids = upload_result.get("attachmentIds", [])
+    if upload_result.get("error"):
+        return upload_result
+    attachment_ids = upload_result.get("attachmentIds", [])
 
     response = await call_brain_pure_llm_chat(
         brain_id,
@@ -326,7 +306,7 @@ async def analyze_pdf_content(
         return response
 
     raw = response.get("result", "")
-    parsed = _parse_json_response(raw)
+    parsed = parse_ai_json(raw)
 
     if not parsed or "diagrams" not in parsed:
         return {
@@ -485,13 +465,12 @@ async def copy_image_as_diagram(image_files: list) -> dict:
     if not image_files:
         return {"error": True, "message": "No images provided", "detail": "Please upload at least one image file."}
 
-    chat_result = await create_chat_history(brain_id)
+    chat_result, upload_result = await start_chat_turn(brain_id, image_files)
     if chat_result.get("error"):
         return {"error": True, "message": "Session error", "detail": chat_result.get("detail", "Could not create chat session.")}
 
     chat_history_id = chat_result.get("chatHistoryId")
 
-    upload_result = await upload_attachments(brain_id, image_files)
     if upload_result.get("error"):
         return upload_result
     attachment_ids = upload_result.get("attachmentIds", [])
@@ -525,21 +504,17 @@ async def copy_image_as_diagram(image_files: list) -> dict:
     updated_chat_id = response.get("chatHistoryId", chat_history_id)
 
     # Check for the not_a_diagram JSON flag - try direct parse first
-    cleaned = re.sub(r"```(?:json)?", "", raw).strip().rstrip("`").strip()
-    try:
-        parsed = json.loads(cleaned)
-        if parsed.get("not_a_diagram"):
-            return {
-                "not_a_diagram": True,
-                "content_type": parsed.get("content_type", "non-diagram content"),
-                "suggestion": parsed.get("suggestion", "Use Analyze Content mode."),
-                "chatHistoryId": updated_chat_id,
-            }
-    except (json.JSONDecodeError, AttributeError):
-        pass
+    parsed = parse_ai_json(raw)
+    if isinstance(parsed, dict) and parsed.get("not_a_diagram"):
+        return {
+            "not_a_diagram": True,
+            "content_type": parsed.get("content_type", "non-diagram content"),
+            "suggestion": parsed.get("suggestion", "Use Analyze Content mode."),
+            "chatHistoryId": updated_chat_id,
+        }
 
     # Try to find the JSON flag embedded anywhere in the response
-    match = re.search(r'\{"not_a_diagram"\s*:\s*true[^}]*\}', raw, re.DOTALL)
+    match = _NOT_A_DIAGRAM_RE.search(raw)
     if match:
         try:
             parsed = json.loads(match.group(0))
@@ -1,6 +1,7 @@
 ﻿
 import io
 import os
+from functools import lru_cache
 from typing import List, Optional
 
 from docx import Document
@@ -8,6 +9,8 @@ from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
 
 
 # -â”€ Paths & constants ------------------
@@ -30,92 +33,118 @@ FS_VARIANT_TEMPLATE_PATH = os.path.join(
 # XML namespace for Word 2010 checkbox SDT elements
 W14_NS = "http://schemas.microsoft.com/office/word/2010/wordml"
 
+# Clark names used when walking/building WordprocessingML directly
+_W_P = qn("w:p")
+_W_R = qn("w:r")
+_W_T = qn("w:t")
+_W_TC = qn("w:tc")
+_W_VAL = qn("w:val")
+_XML_SPACE = qn("xml:space")
+
 BSH_GREY = RGBColor(0x64, 0x74, 0x8B)
 
 
 # -â”€ Low-level helpers ------------------
 
+@lru_cache(maxsize=None)
+def _template_bytes(path: str) -> bytes:
+    """Read a .docx template from disk once per process."""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _open_template(path: str):
+    """Open a fresh, independently editable Document from a cached template."""
+    return Document(io.BytesIO(_template_bytes(path)))
+
+
 def _set_para_text(para, text: str):
-    """Replace a paragraph's text, preserving the first run's formatting."""
-    if para.runs:
-        for run in para.runs[1:]:
-            run.text = ""
-        para.runs[0].text = text
-    else:
+    """Replace a paragraph's text, preserving the first run's formatting.
+
+    The trailing runs are dropped at XML level; only the first run is wrapped
+    so tabs and line breaks in ``text`` still become w:tab / w:br.
+    """
+    p = para._p
+    runs = p.r_lst
+    if not runs:
         para.add_run(text)
+        return
+    for r in runs[1:]:
+        p.remove(r)
+    Run(runs[0], para).text = text
 
 
-def _set_table_cell(table, row_idx, col_idx, text: str):
-    """Write text into a table cell, preserving existing run formatting."""
-    cell = table.cell(row_idx, col_idx)
-    para = cell.paragraphs[0]
-    if para.runs:
-        para.runs[0].text = text
-        for r in para.runs[1:]:
-            r.text = ""
-    else:
-        para.add_run(text)
+def _index_headings(doc) -> dict:
+    """Map each heading paragraph element to (lower-cased text, Paragraph), in document order.
+
+    Resolving ``p.style.name`` goes through the styles part, so the index is
+    built once per document instead of on every section lookup. Filling a
+    template never removes headings, so it stays valid while content changes.
+    """
+    index = {}
+    for p in doc.paragraphs:
+        if "Heading" in p.style.name:
+            index[p._p] = (p.text.strip().lower(), p)
+    return index
 
 
-def _find_heading_para(doc, heading_text: str):
-    """Find a paragraph whose text matches heading_text (case-insensitive prefix)."""
+def _find_heading_para(headings: dict, heading_text: str):
+    """Find a heading whose text matches heading_text (case-insensitive prefix)."""
     target = heading_text.strip().lower()
-    for p in doc.paragraphs:
-        if "Heading" in p.style.name and p.text.strip().lower().startswith(target):
+    for text, p in headings.values():
+        if text.startswith(target):
             return p
     return None
 
 
-def _first_content_para_after(doc, heading_para):
-    """Return the first non-empty Normal paragraph after a heading."""
-    found = False
-    for p in doc.paragraphs:
-        if p._p is heading_para._p:
-            found = True
+def _iter_content_paras(headings: dict, heading_para):
+    """Yield the body paragraphs between heading_para and the next heading."""
+    parent = heading_para._parent
+    for elem in heading_para._p.itersiblings():
+        if elem.tag != _W_P:
             continue
-        if found:
-            if "Heading" in p.style.name:
-                return None  # next heading reached, no content
-            if p.text.strip():
-                return p
+        if elem in headings:
+            return
+        yield Paragraph(elem, parent)
+
+
+def _first_content_para_after(headings: dict, heading_para):
+    """Return the first non-empty paragraph after a heading, or None if the next heading comes first."""
+    for p in _iter_content_paras(headings, heading_para):
+        # itertext walks the w:t nodes in C instead of assembling Paragraph.text run by run
+        if any(t.strip() for t in p._p.itertext(_W_T, with_tail=False)):
+            return p
     return None
 
 
-def _get_content_paras_between_headings(doc, heading_para):
+def _get_content_paras_between_headings(headings: dict, heading_para):
     """Return ALL content paragraphs (empty or not) between heading_para and the next heading."""
-    paras = []
-    found = False
-    for p in doc.paragraphs:
-        if p._p is heading_para._p:
-            found = True
-            continue
-        if found:
-            if "Heading" in p.style.name:
-                break
-            paras.append(p)
-    return paras
+    return list(_iter_content_paras(headings, heading_para))
 
 
-def _remove_paragraph(para):
-    """Remove a paragraph element from the document body."""
-    p_elem = para._element
-    parent = p_elem.getparent()
-    if parent is not None:
-        parent.remove(p_elem)
+def _remove_paragraphs(paras):
+    """Remove sibling paragraphs (e.g. one section's content) from the document."""
+    if not paras:
+        return
+    parent = paras[0]._element.getparent()
+    if parent is None:
+        return
+    for para in paras:
+        parent.remove(para._element)
 
 
-def _clear_section_set_text(doc, heading_para, text: str):
+def _clear_section_set_text(headings: dict, heading_para, text: str):
     """Remove ALL content paragraphs under a heading, then set text on the first one.
     If text is empty, leave the section cleared with one blank paragraph.
     """
-    content_paras = _get_content_paras_between_headings(doc, heading_para)
+    content_paras = _get_content_paras_between_headings(headings, heading_para)
     if not content_paras:
         # No content paras -” insert one
         if text:
             new_p = OxmlElement("w:p")
             new_r = OxmlElement("w:r")
             new_t = OxmlElement("w:t")
-            new_t.set(qn("xml:space"), "preserve")
+            new_t.set(_XML_SPACE, "preserve")
             new_t.text = text
             new_r.append(new_t)
             new_p.append(new_r)
@@ -126,8 +155,7 @@ def _clear_section_set_text(doc, heading_para, text: str):
     _set_para_text(content_paras[0], text if text else "")
 
     # Remove all remaining content paragraphs
-    for p in content_paras[1:]:
-        _remove_paragraph(p)
+    _remove_paragraphs(content_paras[1:])
 
 
 def _ensure_table_rows(table, needed_data_rows: int, header_rows: int = 1):
@@ -142,10 +170,10 @@ def _ensure_table_rows(table, needed_data_rows: int, header_rows: int = 1):
     last_row_elem = table.rows[-1]._tr
     for _ in range(needed_data_rows - current_data):
         new_tr = copy.deepcopy(last_row_elem)
-        for cell_el in new_tr.findall(qn("w:tc")):
-            for p_el in cell_el.findall(qn("w:p")):
-                for r_el in p_el.findall(qn("w:r")):
-                    for t_el in r_el.findall(qn("w:t")):
+        for cell_el in new_tr.findall(_W_TC):
+            for p_el in cell_el.findall(_W_P):
+                for r_el in p_el.findall(_W_R):
+                    for t_el in r_el.findall(_W_T):
                         t_el.text = ""
         table._tbl.append(new_tr)
 
@@ -200,8 +228,9 @@ def generate_functional_spec_docx(data: dict) -> io.BytesIO:
         8.  Glossary                     -> Table 2
         9.  Document history             -> Table 3
     """
-    doc = Document(TEMPLATE_PATH)
+    doc = _open_template(TEMPLATE_PATH)
     tables = doc.tables
+    headings = _index_headings(doc)
 
 
     # 1. PAGE HEADER -” Title, Date, Version, Author
@@ -235,7 +264,7 @@ def generate_functional_spec_docx(data: dict) -> io.BytesIO:
     # 2. RESPONSIBILITIES TABLE (Table 0)
 
     resp_table = tables[0]
-    responsibilities = data.get("responsibilities", {})
+    responsibilities = data.get("responsibilities") or {}
 
     resp_map = {
         1: "globalBusiness",
@@ -245,7 +274,7 @@ def generate_functional_spec_docx(data: dict) -> io.BytesIO:
     }
 
     for row_idx, key in resp_map.items():
-        entry = responsibilities.get(key, {})
+        entry = responsibilities.get(key) or {}
         name = entry.get("name", "").strip()
         date_str = entry.get("date", "").strip()
         if name:
@@ -268,21 +297,21 @@ def generate_functional_spec_docx(data: dict) -> io.BytesIO:
 
     for heading_text, data_key in multi_para_sections:
         user_text = data.get(data_key, "").strip()
-        heading_para = _find_heading_para(doc, heading_text)
+        heading_para = _find_heading_para(headings, heading_text)
         if not heading_para:
             continue
-        _clear_section_set_text(doc, heading_para, user_text)
+        _clear_section_set_text(headings, heading_para, user_text)
 
     # - Solution definition intro (Report / Transaction / Source System) -
     # P66-70: "For detailed analysis..." + Report + Transaction + Source system
     # Clear boilerplate, replace with user's report/transaction/sourceSystem
-    sol_def_heading = _find_heading_para(doc, "Solution definition")
+    sol_def_heading = _find_heading_para(headings, "Solution definition")
     if sol_def_heading:
         report = data.get("report", "").strip()
         transaction = data.get("transaction", "").strip()
         source_system = data.get("sourceSystem", "").strip()
 
-        content_paras = _get_content_paras_between_headings(doc, sol_def_heading)
+        content_paras = _get_content_paras_between_headings(headings, sol_def_heading)
         if content_paras:
             # First para (P66): "For detailed analysis..." --> set Report value
             if report:
@@ -307,8 +336,7 @@ def generate_functional_spec_docx(data: dict) -> io.BytesIO:
                     _set_para_text(content_paras[idx], "")
                 idx += 1
             # Remove any remaining content paras
-            for p in content_paras[idx:]:
-                _remove_paragraph(p)
+            _remove_paragraphs(content_paras[idx:])
 
     # Sections that only need the first content paragraph replaced (simple ones)
     simple_sections = [
@@ -330,17 +358,17 @@ def generate_functional_spec_docx(data: dict) -> io.BytesIO:
         user_text = data.get(data_key, "").strip()
         if not user_text:
             continue
-        heading_para = _find_heading_para(doc, heading_text)
+        heading_para = _find_heading_para(headings, heading_text)
         if not heading_para:
             continue
-        content_para = _first_content_para_after(doc, heading_para)
+        content_para = _first_content_para_after(headings, heading_para)
         if content_para:
             _set_para_text(content_para, user_text)
         else:
             new_p = OxmlElement("w:p")
             new_r = OxmlElement("w:r")
             new_t = OxmlElement("w:t")
-            new_t.set(qn("xml:space"), "preserve")
+            new_t.set(_XML_SPACE, "preserve")
             new_t.text = user_text
             new_r.append(new_t)
             new_p.append(new_r)
@@ -390,10 +418,8 @@ def _set_table_cell(table, row_idx, col_idx, text: str):
     """Set text in a specific table cell, preserving first run formatting."""
     cell = table.rows[row_idx].cells[col_idx]
     para = cell.paragraphs[0]
-    if para.runs:
-        para.runs[0].text = text
-        for r in para.runs[1:]:
-            r.text = ""
+    if para._p.r_lst:
+        _set_para_text(para, text)
     else:
         para.text = text
 
@@ -406,12 +432,12 @@ def _append_text_after_heading(doc, heading_para, text: str):
     # Match document default font
     rpr = OxmlElement("w:rPr")
     sz = OxmlElement("w:sz")
-    sz.set(qn("w:val"), "22")  # 11pt
+    sz.set(_W_VAL, "22")  # 11pt
     rpr.append(sz)
     new_r.append(rpr)
 
     new_t = OxmlElement("w:t")
-    new_t.set(qn("xml:space"), "preserve")
+    new_t.set(_XML_SPACE, "preserve")
     new_t.text = text
     new_r.append(new_t)
     new_p.append(new_r)
@@ -444,7 +470,7 @@ def generate_br_docx(data: dict) -> io.BytesIO:
         Table 0 (4x4): Header info (title, project, product owner, IT product, target date, requestor, company)
         Table 2 (5x4): Responsibles (Local Business, Global Business, Global Shape GDS, Regional Shape GDS)
     """
-    doc = Document(BR_TEMPLATE_PATH)
+    doc = _open_template(BR_TEMPLATE_PATH)
     paras = doc.paragraphs
     tables = doc.tables
 
@@ -502,7 +528,7 @@ def generate_br_docx(data: dict) -> io.BytesIO:
     # 2. RESPONSIBLES TABLE (Table 2)
 
     resp_table = tables[2]
-    responsibles = data.get("responsibles", {})
+    responsibles = data.get("responsibles") or {}
 
     # Row mapping: 1=Local Business, 2=Global Business, 3=Global Shape GDS, 4=Regional Shape GDS
     # Columns: 0=Role, 1=eMail, 2=Company, 3=Department
@@ -514,7 +540,7 @@ def generate_br_docx(data: dict) -> io.BytesIO:
     }
 
     for row_idx, key in resp_map.items():
-        entry = responsibles.get(key, {})
+        entry = responsibles.get(key) or {}
         email = entry.get("email", "").strip()
         company = entry.get("company", "").strip()
         dept = entry.get("department", "").strip()
@@ -528,7 +554,7 @@ def generate_br_docx(data: dict) -> io.BytesIO:
 
     # 3. BUSINESS REQUIREMENT DESCRIPTION (paras 6-11)
 
-    description = data.get("description", {})
+    description = data.get("description") or {}
 
     field_map = {
         6: "initialSituation",
@@ -547,7 +573,7 @@ def generate_br_docx(data: dict) -> io.BytesIO:
 
     # 4. BENEFITS (paras 14-16)
 
-    benefits = data.get("benefits", {})
+    benefits = data.get("benefits") or {}
 
     benefits_map = {
         14: "benefitsReached",
@@ -566,29 +592,25 @@ def generate_br_docx(data: dict) -> io.BytesIO:
     #    Row 1: Global Business Process Owner
     #    Row 2: GDS Product Owner / Manager
 
-    sign_off = data.get("signOff", {})
+    sign_off = data.get("signOff") or {}
     signoff_table = tables[3]
 
-    gbpo = sign_off.get("gbpo", {})
-    if gbpo.get("name", "").strip():
-        _set_table_cell(signoff_table, 1, 1, gbpo["name"].strip())
-    if gbpo.get("department", "").strip():
-        _set_table_cell(signoff_table, 1, 2, gbpo["department"].strip())
-    if gbpo.get("date", "").strip():
-        _set_table_cell(signoff_table, 1, 3, gbpo["date"].strip())
+    signoff_map = {
+        1: "gbpo",
+        2: "gds",
+    }
 
-    gds = sign_off.get("gds", {})
-    if gds.get("name", "").strip():
-        _set_table_cell(signoff_table, 2, 1, gds["name"].strip())
-    if gds.get("department", "").strip():
-        _set_table_cell(signoff_table, 2, 2, gds["department"].strip())
-    if gds.get("date", "").strip():
-        _set_table_cell(signoff_table, 2, 3, gds["date"].strip())
+    for row_idx, key in signoff_map.items():
+        entry = sign_off.get(key) or {}
+        for col_idx, field_key in ((1, "name"), (2, "department"), (3, "date")):
+            value = entry.get(field_key, "").strip()
+            if value:
+                _set_table_cell(signoff_table, row_idx, col_idx, value)
 
 
     # 6. COST ESTIMATION & DECISION
 
-    decision = data.get("decision", {})
+    decision = data.get("decision") or {}
 
     # Table 5: Evaluation (single-cell table)
     evaluation = decision.get("evaluation", "").strip()
@@ -665,7 +687,7 @@ def generate_br_docx(data: dict) -> io.BytesIO:
     #    Rows 1-3: data rows
     #    Row 4: totals
 
-    costs = data.get("costs", {})
+    costs = data.get("costs") or {}
     cost_rows = costs.get("rows", [])
     cost_table = tables[12]
 
@@ -800,9 +822,10 @@ def generate_fs_variant_docx(data: dict) -> io.BytesIO:
         3.14 Test Specification -” Table 5 (5x4), Table 6 (2x2)
       Â§4  Change History -” Table 7 (7x4)
     """
-    doc = Document(FS_VARIANT_TEMPLATE_PATH)
+    doc = _open_template(FS_VARIANT_TEMPLATE_PATH)
     paras = doc.paragraphs
     tables = doc.tables
+    headings = _index_headings(doc)
 
 
     # 1. COVER PAGE -” Description, Written By, Date
@@ -880,9 +903,9 @@ def generate_fs_variant_docx(data: dict) -> io.BytesIO:
 
     processing_logic = data.get("processingLogic", "").strip()
     if processing_logic:
-        heading = _find_heading_para(doc, "2. Detail Processing Logic")
+        heading = _find_heading_para(headings, "2. Detail Processing Logic")
         if heading:
-            content = _first_content_para_after(doc, heading)
+            content = _first_content_para_after(headings, heading)
             if content:
                 _set_para_text(content, processing_logic)
             else:
@@ -891,7 +914,7 @@ def generate_fs_variant_docx(data: dict) -> io.BytesIO:
     prerequisites = data.get("prerequisites", "").strip()
     if prerequisites and len(paras) > 69:
         # Para 68 is "Prerequisites/Assumptions" label, 69 is content
-        prereq_heading = _find_heading_para(doc, "Prerequisites")
+        prereq_heading = _find_heading_para(headings, "Prerequisites")
         if not prereq_heading:
             # It's a normal paragraph, find para 68 and add content after
             _set_para_text(paras[69], prerequisites)
@@ -910,7 +933,7 @@ def generate_fs_variant_docx(data: dict) -> io.BytesIO:
     #    Rows: Standard, Interactive, Drill-Down, ALV, Other
     #    Cols: Type, Yes/No, Comments
 
-    report_chars = data.get("reportCharacteristics", {})
+    report_chars = data.get("reportCharacteristics") or {}
     char_table = tables[2]
     char_map = {
         0: "standard",
@@ -920,7 +943,7 @@ def generate_fs_variant_docx(data: dict) -> io.BytesIO:
         4: "other",
     }
     for row_idx, key in char_map.items():
-        entry = report_chars.get(key, {})
+        entry = report_chars.get(key) or {}
         yn = entry.get("value", "").strip()
         comment = entry.get("comments", "").strip()
         if yn:
@@ -957,10 +980,10 @@ def generate_fs_variant_docx(data: dict) -> io.BytesIO:
         user_text = data.get(data_key, "").strip()
         if not user_text:
             continue
-        heading_para = _find_heading_para(doc, heading_text)
+        heading_para = _find_heading_para(headings, heading_text)
         if not heading_para:
             continue
-        content_para = _first_content_para_after(doc, heading_para)
+        content_para = _first_content_para_after(headings, heading_para)
         if content_para:
             _set_para_text(content_para, user_text)
 
@@ -984,9 +1007,9 @@ def generate_fs_variant_docx(data: dict) -> io.BytesIO:
     # Test Data text (after "Test Data & Other Needs" heading)
     test_data = data.get("testData", "").strip()
     if test_data:
-        td_heading = _find_heading_para(doc, "Test Data")
+        td_heading = _find_heading_para(headings, "Test Data")
         if td_heading:
-            content = _first_content_para_after(doc, td_heading)
+            content = _first_content_para_after(headings, td_heading)
             if content:
                 _set_para_text(content, test_data)
 
@@ -7,10 +7,9 @@ import os
 import re
 
 from app.services.common_service import (
-    create_chat_history,
+    start_chat_turn,
     call_brain_pure_llm_chat,
-    upload_attachments,
-    extract_pdf_text,
+    extract_pdf_texts,
     sanitize_filename_for_prompt,
 )
 
@@ -239,9 +238,9 @@ async def extract_one_pager_content(
 
     all_text_parts: list[str] = []
     errors: list[str] = []
-    for fname, fbytes in pdf_bytes_list:
+    extracted = await extract_pdf_texts([fbytes for _, fbytes in pdf_bytes_list])
+    for (fname, _), (text, err) in zip(pdf_bytes_list, extracted):
         safe_name = sanitize_filename_for_prompt(fname)
-        text, err = extract_pdf_text(fbytes)
         if err:
             errors.append(f"{safe_name}: {err}")
         elif text:
@@ -321,18 +320,15 @@ async def extract_one_pager_content(
     prompt_parts.append("Generate the complete, beautiful, print-ready one-pager HTML document now.")
     prompt = "\n\n".join(prompt_parts)
 
-    chat_result = await create_chat_history(brain_id)
+    chat_result, upload_result = await start_chat_turn(brain_id, image_files if has_images else None)
     if chat_result.get("error"):
         return chat_result
 
     chat_history_id = chat_result.get("chatHistoryId")
 
-    attachment_ids = []
-    if has_images:
-        upload_result = await upload_attachments(brain_id, image_files)
-        if upload_result.get("error"):
-            return upload_result
-        attachment_ids = upload_result.get("attachmentIds", [])
+    if upload_result.get("error"):
+        return upload_result
+    attachment_ids = upload_result.get("attachmentIds", [])
 
     response = await call_brain_pure_llm_chat(
         brain_id,
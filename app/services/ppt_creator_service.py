@@ -5,12 +5,14 @@ Reads PDF content, sends to AI for structuring into slides,
 then builds a .pptx using varied layouts from the BSH template
 with SmartArt-like diagrams and placeholder images.
 """
+import copy
 import io
 import json
 import math
 import os
 import re
 import zipfile
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 from PIL import Image, ImageDraw, ImageFont
@@ -19,13 +21,15 @@ from pptx.util import Inches, Pt, Emu
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
+from pptx.oxml import parse_xml
+from pptx.text.text import _Run
 
 from app.services.common_service import (
-    create_chat_history,
+    start_chat_turn,
     call_brain_pure_llm_chat,
-    upload_attachments,
-    extract_pdf_text,
+    extract_pdf_texts,
     sanitize_filename_for_prompt,
+    parse_ai_json,
 )
 
 TEMPLATE_PATH = os.path.join(
@@ -188,27 +192,6 @@ REFINE_BEHAVIOUR = (
 )
 
 
-# ─── JSON parsing ────────────────────────────────────────
-
-def _parse_json_response(text: str) -> dict:
-    """Try to parse a JSON object from the AI response."""
-    cleaned = re.sub(r"```(?:json)?", "", text).strip().rstrip("`").strip()
-
-    try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
-        pass
-
-    match = re.search(r"\{.*\}", cleaned, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group())
-        except json.JSONDecodeError:
-            pass
-
-    return {}
-
-
 # ─── Placeholder image generation ────────────────────────
 
 def _create_placeholder_image(
@@ -1142,21 +1125,33 @@ SMART_ART_DRAWERS = {
 
 # ─── Template loader ─────────────────────────────────────
 
+@lru_cache(maxsize=1)
+def _template_bytes() -> Optional[bytes]:
+    """Return the .potx template repackaged as a .pptx, built once per process.
+
+    python-pptx refuses the template content type, so [Content_Types].xml is
+    patched while copying the archive; the result is reused for every deck.
+    """
+    if not os.path.exists(TEMPLATE_PATH):
+        return None
+    raw = io.BytesIO()
+    with zipfile.ZipFile(TEMPLATE_PATH, "r") as zin, zipfile.ZipFile(raw, "w") as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename == "[Content_Types].xml":
+                data = data.replace(
+                    b"application/vnd.openxmlformats-officedocument.presentationml.template.main+xml",
+                    b"application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml",
+                )
+            zout.writestr(item, data)
+    return raw.getvalue()
+
+
 def _load_template() -> Presentation:
-    """Load the .potx template, patching Content_Types for python-pptx compatibility."""
-    if os.path.exists(TEMPLATE_PATH):
-        raw = io.BytesIO()
-        with zipfile.ZipFile(TEMPLATE_PATH, "r") as zin, zipfile.ZipFile(raw, "w") as zout:
-            for item in zin.infolist():
-                data = zin.read(item.filename)
-                if item.filename == "[Content_Types].xml":
-                    data = data.replace(
-                        b"application/vnd.openxmlformats-officedocument.presentationml.template.main+xml",
-                        b"application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml",
-                    )
-                zout.writestr(item, data)
-        raw.seek(0)
-        return Presentation(raw)
+    """Load a fresh copy of the template (or a blank 16:9 deck if it is missing)."""
+    template = _template_bytes()
+    if template is not None:
+        return Presentation(io.BytesIO(template))
     else:
         prs = Presentation()
         prs.slide_width = Inches(13.333)
@@ -1174,6 +1169,9 @@ _EMOJI_RE = re.compile(
     r'\u20D0-\u20FF]',            # Combining diacritical marks for symbols
     re.UNICODE,
 )
+_STRIKE_MD_RE = re.compile(r'~~(.*?)~~')
+_BOLD_MD_RE = re.compile(r'\*\*(.*?)\*\*')
+_ITALIC_MD_RE = re.compile(r'\*(.*?)\*')
 
 _ADML_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
 _RPR_TAGS = frozenset([
@@ -1199,19 +1197,30 @@ def _clean_text(s: str) -> str:
     """Strip emoji and markdown formatting markers from text before inserting into slides."""
     if not s:
         return s
-    s = re.sub(r'~~(.*?)~~', r'\1', s)          # ~~strikethrough~~ -> text
-    s = re.sub(r'\*\*(.*?)\*\*', r'\1', s)     # **bold** -> text
-    s = re.sub(r'\*(.*?)\*', r'\1', s)          # *italic* -> text
+    s = _STRIKE_MD_RE.sub(r'\1', s)   # ~~strikethrough~~ -> text
+    s = _BOLD_MD_RE.sub(r'\1', s)     # **bold** -> text
+    s = _ITALIC_MD_RE.sub(r'\1', s)   # *italic* -> text
     s = _EMOJI_RE.sub('', s)
     return s.strip()
 
 
-def _set_placeholder_text(slide, ph_idx: int, text: str):
-    """Safely set text on a placeholder by index."""
-    try:
-        slide.placeholders[ph_idx].text = _clean_text(text)
-    except (KeyError, IndexError):
-        pass
+def _placeholders_by_idx(slide) -> dict:
+    """Map placeholder idx -> placeholder, scanning the slide's shapes once.
+
+    ``slide.placeholders[idx]`` walks the shape tree on every lookup and raises
+    KeyError for a missing idx, so builders look placeholders up in this map.
+    """
+    phs = {}
+    for ph in slide.placeholders:
+        phs.setdefault(ph.placeholder_format.idx, ph)
+    return phs
+
+
+def _set_placeholder_text(phs: dict, ph_idx: int, text: str):
+    """Set text on a placeholder by index, if the layout has it."""
+    ph = phs.get(ph_idx)
+    if ph is not None:
+        ph.text = _clean_text(text)
 
 
 def _fill_bullets(placeholder, bullets: list[str]):
@@ -1235,13 +1244,15 @@ def _fill_bullets(placeholder, bullets: list[str]):
         pass
 
 
-def _insert_placeholder_image(slide, ph_idx: int, description: str):
+def _insert_placeholder_image(phs: dict, ph_idx: int, description: str):
     """Insert a placeholder image into a picture placeholder."""
+    pic_ph = phs.get(ph_idx)
+    if pic_ph is None:
+        return
     try:
-        pic_ph = slide.placeholders[ph_idx]
         img_buf = _create_placeholder_image(description)
         pic_ph.insert_picture(img_buf)
-    except (KeyError, IndexError, Exception):
+    except Exception:
         pass
 
 
@@ -1255,13 +1266,33 @@ def _add_textbox(slide, text, left, top, width, height, font_size, bold, color):
     _style_para(p, font_size, color, bold)
 
 
+@lru_cache(maxsize=None)
+def _styled_rpr(size, color, bold):
+    """Build the a:rPr for one (size, colour, bold) combination once per process."""
+    r = parse_xml(f'<a:r xmlns:a="{_ADML_NS}"><a:t/></a:r>')
+    font = _Run(r, None).font
+    font.size = size
+    font.color.rgb = color
+    font.bold = bold
+    font.strike = False
+    return r.rPr
+
+
 def _style_para(para, size, color, bold=False):
     """Apply font styling to a paragraph."""
-    for run in para.runs:
-        run.font.size = size
-        run.font.color.rgb = color
-        run.font.bold = bold
-        run.font.strike = False
+    template = None
+    for r in para._p.r_lst:
+        if r.rPr is None:
+            # Fresh runs get a copy of the prebuilt rPr instead of four font descriptor round-trips
+            if template is None:
+                template = _styled_rpr(size, color, bold)
+            r.insert(0, copy.deepcopy(template))
+            continue
+        font = _Run(r, para).font
+        font.size = size
+        font.color.rgb = color
+        font.bold = bold
+        font.strike = False
 
 
 def _add_title_accent(slide):
@@ -1297,22 +1328,25 @@ def _add_chapter_accent(slide):
 def _build_title_slide(prs, slide_data, layout, is_chapter: bool = False):
     """Build a title / chapter / end slide."""
     slide = prs.slides.add_slide(layout)
-    _set_placeholder_text(slide, 0, slide_data.get("title", ""))
+    phs = _placeholders_by_idx(slide)
+    _set_placeholder_text(phs, 0, slide_data.get("title", ""))
     subtitle = slide_data.get("subtitle", "")
     if subtitle:
-        _set_placeholder_text(slide, 1, subtitle)
+        _set_placeholder_text(phs, 1, subtitle)
     return slide
 
 
 def _build_content_slide(prs, slide_data, layout):
     """Build a standard content slide with title + bullets."""
     slide = prs.slides.add_slide(layout)
-    _set_placeholder_text(slide, 0, slide_data.get("title", ""))
+    phs = _placeholders_by_idx(slide)
+    _set_placeholder_text(phs, 0, slide_data.get("title", ""))
     bullets = slide_data.get("bullets", [])
     if bullets:
-        try:
-            _fill_bullets(slide.placeholders[1], bullets)
-        except (KeyError, IndexError):
+        body = phs.get(1)
+        if body is not None:
+            _fill_bullets(body, bullets)
+        else:
             y = Inches(1.6)
             for b in bullets:
                 _add_textbox(slide, f"• {b}", Inches(1), y, Inches(11), Inches(0.5), Pt(16), False, BSH_NAVY)
@@ -1324,15 +1358,13 @@ def _build_content_slide(prs, slide_data, layout):
 def _build_content_with_image_slide(prs, slide_data, layout):
     """Build text+image slide (layout 11: text left, picture right)."""
     slide = prs.slides.add_slide(layout)
-    _set_placeholder_text(slide, 0, slide_data.get("title", ""))
+    phs = _placeholders_by_idx(slide)
+    _set_placeholder_text(phs, 0, slide_data.get("title", ""))
     bullets = slide_data.get("bullets", [])
-    if bullets:
-        try:
-            _fill_bullets(slide.placeholders[1], bullets)
-        except (KeyError, IndexError):
-            pass
+    if bullets and 1 in phs:
+        _fill_bullets(phs[1], bullets)
     desc = slide_data.get("image_description", "Relevant visual")
-    _insert_placeholder_image(slide, 2, desc)
+    _insert_placeholder_image(phs, 2, desc)
     _add_title_accent(slide)
     return slide
 
@@ -1340,15 +1372,13 @@ def _build_content_with_image_slide(prs, slide_data, layout):
 def _build_image_with_content_slide(prs, slide_data, layout):
     """Build image+text slide (layout 12: picture left, text right)."""
     slide = prs.slides.add_slide(layout)
-    _set_placeholder_text(slide, 0, slide_data.get("title", ""))
+    phs = _placeholders_by_idx(slide)
+    _set_placeholder_text(phs, 0, slide_data.get("title", ""))
     bullets = slide_data.get("bullets", [])
-    if bullets:
-        try:
-            _fill_bullets(slide.placeholders[2], bullets)
-        except (KeyError, IndexError):
-            pass
+    if bullets and 2 in phs:
+        _fill_bullets(phs[2], bullets)
     desc = slide_data.get("image_description", "Relevant visual")
-    _insert_placeholder_image(slide, 1, desc)
+    _insert_placeholder_image(phs, 1, desc)
     _add_title_accent(slide)
     return slide
 
@@ -1356,9 +1386,10 @@ def _build_image_with_content_slide(prs, slide_data, layout):
 def _build_full_image_slide(prs, slide_data, layout):
     """Build title + full image slide (layout 7)."""
     slide = prs.slides.add_slide(layout)
-    _set_placeholder_text(slide, 0, slide_data.get("title", ""))
+    phs = _placeholders_by_idx(slide)
+    _set_placeholder_text(phs, 0, slide_data.get("title", ""))
     desc = slide_data.get("image_description", "Full-width visual")
-    _insert_placeholder_image(slide, 1, desc)
+    _insert_placeholder_image(phs, 1, desc)
     _add_title_accent(slide)
     return slide
 
@@ -1366,7 +1397,8 @@ def _build_full_image_slide(prs, slide_data, layout):
 def _build_multi_column_slide(prs, slide_data, layout, num_cols: int):
     """Build a multi-column slide (2, 3, or 4 columns)."""
     slide = prs.slides.add_slide(layout)
-    _set_placeholder_text(slide, 0, slide_data.get("title", ""))
+    phs = _placeholders_by_idx(slide)
+    _set_placeholder_text(phs, 0, slide_data.get("title", ""))
 
     columns = slide_data.get("columns", [])
 
@@ -1380,25 +1412,22 @@ def _build_multi_column_slide(prs, slide_data, layout, num_cols: int):
             if heading:
                 all_text.append(_clean_text(heading))
             all_text.extend([_clean_text(b) for b in col_bullets])
-            if all_text:
-                try:
-                    tf = slide.placeholders[ph_idx].text_frame
-                    tf.clear()
-                    for j, txt in enumerate(all_text):
-                        if j == 0:
-                            tf.paragraphs[0].text = txt
-                            _style_para(
-                                tf.paragraphs[0],
-                                Pt(16) if j == 0 and heading else Pt(14),
-                                BSH_ORANGE if bool(heading) else BSH_NAVY,
-                                j == 0 and bool(heading),
-                            )
-                        else:
-                            p = tf.add_paragraph()
-                            p.text = txt
-                            _style_para(p, Pt(14), BSH_NAVY)
-                except (KeyError, IndexError):
-                    pass
+            if all_text and ph_idx in phs:
+                tf = phs[ph_idx].text_frame
+                tf.clear()
+                for j, txt in enumerate(all_text):
+                    if j == 0:
+                        tf.paragraphs[0].text = txt
+                        _style_para(
+                            tf.paragraphs[0],
+                            Pt(16) if j == 0 and heading else Pt(14),
+                            BSH_ORANGE if bool(heading) else BSH_NAVY,
+                            j == 0 and bool(heading),
+                        )
+                    else:
+                        p = tf.add_paragraph()
+                        p.text = txt
+                        _style_para(p, Pt(14), BSH_NAVY)
 
     return slide
 
@@ -1406,14 +1435,16 @@ def _build_multi_column_slide(prs, slide_data, layout, num_cols: int):
 def _build_title_only_slide(prs, slide_data, layout):
     """Build a title-only slide (layout 13)."""
     slide = prs.slides.add_slide(layout)
-    _set_placeholder_text(slide, 0, slide_data.get("title", ""))
+    phs = _placeholders_by_idx(slide)
+    _set_placeholder_text(phs, 0, slide_data.get("title", ""))
     return slide
 
 
 def _build_smart_art_slide(prs, slide_data, layout, force_orange_theme: bool = False):
     """Build a slide with SmartArt-like diagram shapes."""
     slide = prs.slides.add_slide(layout)
-    _set_placeholder_text(slide, 0, slide_data.get("title", ""))
+    phs = _placeholders_by_idx(slide)
+    _set_placeholder_text(phs, 0, slide_data.get("title", ""))
 
     sa = slide_data.get("smart_art", {})
     sa_type = sa.get("type", "list_blocks")
@@ -1488,7 +1519,7 @@ def generate_pptx_file(
             slide = _build_title_slide(prs, slide_data, layout)
             # Add image placeholder if description provided
             desc = slide_data.get("image_description", "Opening visual")
-            _insert_placeholder_image(slide, 2, desc)
+            _insert_placeholder_image(_placeholders_by_idx(slide), 2, desc)
 
         elif layout_name == "content":
             slide = _build_content_slide(prs, slide_data, layout)
@@ -1578,8 +1609,8 @@ async def extract_pdf_content(
 
     all_text_parts: list[str] = []
     errors: list[str] = []
-    for fname, fbytes in pdf_bytes_list:
-        text, err = extract_pdf_text(fbytes)
+    extracted = await extract_pdf_texts([fbytes for _, fbytes in pdf_bytes_list])
+    for (fname, _), (text, err) in zip(pdf_bytes_list, extracted):
         if err:
             errors.append(f"{sanitize_filename_for_prompt(fname)}: {err}")
         elif text:
@@ -1624,18 +1655,15 @@ async def extract_pdf_content(
     else:
         prompt = body
 
-    chat_result = await create_chat_history(brain_id)
+    chat_result, upload_result = await start_chat_turn(brain_id, image_files if has_images else None)
     if chat_result.get("error"):
         return chat_result
 
     chat_history_id = chat_result.get("chatHistoryId")
 
-    attachment_ids = []
-    if has_images:
-        upload_result = await upload_attachments(brain_id, image_files)
-        if upload_result.get("error"):
-            return upload_result
-        attachment_ids = upload_result.get("attachmentIds", [])
+    if upload_result.get("error"):
+        return upload_result
+    attachment_ids = upload_result.get("attachmentIds", [])
 
     response = await call_brain_pure_llm_chat(
         brain_id,
@@ -1646,7 +1674,7 @@ async def extract_pdf_content(
     )
 
     raw = response.get("result", "")
-    parsed = _parse_json_response(raw)
+    parsed = parse_ai_json(raw)
 
     if not parsed or "slides" not in parsed:
         return {
@@ -1702,7 +1730,7 @@ async def refine_ppt_content(
         return response
 
     raw = response.get("result", "")
-    parsed = _parse_json_response(raw)
+    parsed = parse_ai_json(raw)
 
     if not parsed or "slides" not in parsed:
         return {
@@ -4,11 +4,11 @@ Handles BPMN XML generation from process descriptions.
 """
 import os
 import re
+import string
 from typing import Optional
 from fastapi import UploadFile
 from app.services.common_service import (
-    create_chat_history,
-    upload_attachments,
+    start_chat_turn,
     call_brain_workflow_chat,
     sanitize_filename_for_prompt,
 )
@@ -16,6 +16,7 @@ from app.services.common_service import (
 
 # Signavio-specific constants
 SIGNAVIO_WORKFLOW_ID = os.getenv("SIGNAVIO_WORKFLOW_ID", "BW10nzxLhlqO")
+SIGNAVIO_BRAIN_ID = os.getenv("SIGNAVIO_BRAIN_ID")
 
 ANALYSIS_BEHAVIOUR = (
     "Provide a structured analysis of the BPMN process. "
@@ -60,57 +61,95 @@ _DOCUMENT_INVALID_INDICATORS = [
 ]
 
 
+_BPMN_TAG_RE = re.compile(r"<bpmn", re.IGNORECASE)
+_DOCUMENT_TAG_RE = re.compile(r'^\[(?:DOCUMENT_INVALID|DOCUMENT_VALID)\]\s*')
+
+# Folds only A-Z so the lowered copy always has the same length (offsets stay valid)
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_XML_DECL = "<?xml"
+_DEFINITIONS_OPEN_TAGS = ("<bpmn:definitions", "<bpmn2:definitions")
+_DEFINITIONS_CLOSE_TAGS = ("</bpmn:definitions>", "</bpmn2:definitions>")
+
+
+def _find_first(haystack: str, needles: tuple, start: int = 0) -> tuple[int, str]:
+    """Return (index, needle) of the earliest needle in haystack, or (-1, "")."""
+    best_idx, best_needle = -1, ""
+    for needle in needles:
+        idx = haystack.find(needle, start)
+        if idx != -1 and (best_idx == -1 or idx < best_idx):
+            best_idx, best_needle = idx, needle
+    return best_idx, best_needle
+
+
 def _extract_xml(text: str) -> str:
-    """Extract BPMN XML from the AI response."""
-    pattern = r"(<\?xml.*?<bpmn2?:definitions.*?</bpmn2?:definitions>)"
-    match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
+    """Extract BPMN XML from the AI response.
 
-    secondary_pattern = r"(<bpmn2?:definitions.*?</bpmn2?:definitions>)"
-    secondary_match = re.search(secondary_pattern, text, re.DOTALL | re.IGNORECASE)
-    if secondary_match:
-        return secondary_match.group(1).strip()
+    Locates the definitions block with plain str.find calls instead of a
+    DOTALL regex, so large responses are scanned linearly without backtracking.
+    Opening and closing tags may use different prefixes (bpmn/bpmn2).
+    """
+    # Any match needs a closing tag; plain-text replies (refusals, analyses)
+    # skip building the case-folded copy entirely.
+    if "</" not in text:
+        return text.strip()
+
+    lowered = text.lower() if text.isascii() else text.translate(_ASCII_LOWER)
+
+    open_idx, _ = _find_first(lowered, _DEFINITIONS_OPEN_TAGS)
+    if open_idx == -1:
+        return text.strip()
+
+    close_idx, close_tag = _find_first(lowered, _DEFINITIONS_CLOSE_TAGS, open_idx)
+    if close_idx == -1:
+        return text.strip()
+
+    decl_idx = lowered.find(_XML_DECL, 0, open_idx)
+    start = decl_idx if decl_idx != -1 else open_idx
+    return text[start:close_idx + len(close_tag)].strip()
+
+
+# One row per form field: (key, BPMN prompt label, analysis prompt label, analysis default)
+_PROMPT_FIELDS = (
+    ("processName", "Process Name: ", "Process Name: ", "Not specified"),
+    ("poolName", "Pool: ", "Pool/Department: ", "Not specified"),
+    ("participants", "Participants (lanes): ", "Participants/Lanes: ", "Not specified"),
+    ("subLanes", "Sublanes: ", "Sub-lanes: ", "Not specified"),
+    ("startTriggers", "Start Triggers: ", "Start Triggers: ", "Not specified"),
+    ("processActivities", "Activities and Process Steps: ", "Activities & Flow: ", "Not specified"),
+    ("processEnding", "End State: ", "End States: ", "Not specified"),
+    ("intermediateEvents", "Intermediate/Delays: ", "Delays/Intermediate Events: ", "Not specified"),
+    ("reviewOverride", "Overrides/Notes: ", "Additional Notes: ", "None"),
+)
 
-    return text.strip()
+_BPMN_PROMPT_HEADER = (
+    "You are a expert BPMN 2.0 assistant. "
+    "Generate a Signavio-compatible BPMN 2.0 XML for my following process. "
+)
+_ANALYSIS_PROMPT_HEADER = "Analyze this BPMN process:\n\n"
 
 
 def build_bpmn_prompt(data: dict) -> str:
     """Structure the BPMN generation prompt to keep responses concise and XML-only."""
-    return (
-        "You are a expert BPMN 2.0 assistant. "
-        "Generate a Signavio-compatible BPMN 2.0 XML for my following process. "
-        f"Process Name: {data.get('processName', '')}\n"
-        f"Pool: {data.get('poolName', '')}\n"
-        f"Participants (lanes): {data.get('participants', '')}\n"
-        f"Sublanes: {data.get('subLanes', '')}\n"
-        f"Start Triggers: {data.get('startTriggers', '')}\n"
-        f"Activities and Process Steps: {data.get('processActivities', '')}\n"
-        f"End State: {data.get('processEnding', '')}\n"
-        f"Intermediate/Delays: {data.get('intermediateEvents', '')}\n"
-        f"Overrides/Notes: {data.get('reviewOverride', '')}\n"
-    )
+    lines = [
+        f"{label}{data.get(key, '')}\n"
+        for key, label, _, _ in _PROMPT_FIELDS
+    ]
+    return _BPMN_PROMPT_HEADER + "".join(lines)
 
 
 def build_analysis_prompt(data: dict) -> str:
     """Build a simple prompt with process inputs - Brain agent handles the analysis structure."""
-    return f"""Analyze this BPMN process:
-
-Process Name: {data.get('processName', 'Not specified')}
-Pool/Department: {data.get('poolName', 'Not specified')}
-Participants/Lanes: {data.get('participants', 'Not specified')}
-Sub-lanes: {data.get('subLanes', 'Not specified')}
-Start Triggers: {data.get('startTriggers', 'Not specified')}
-Activities & Flow: {data.get('processActivities', 'Not specified')}
-End States: {data.get('processEnding', 'Not specified')}
-Delays/Intermediate Events: {data.get('intermediateEvents', 'Not specified')}
-Additional Notes: {data.get('reviewOverride', 'None')}"""
+    lines = [
+        f"{label}{data.get(key, default)}"
+        for key, _, label, default in _PROMPT_FIELDS
+    ]
+    return _ANALYSIS_PROMPT_HEADER + "\n".join(lines)
 
 
 async def get_signavio_bpmn_xml(data: dict, chat_history_id: Optional[str] = None) -> dict:
     """Generate BPMN XML using the chat history context."""
     prompt = "DSCP SIR GO GENERATE the BPMN XML for this process now." if chat_history_id else build_bpmn_prompt(data)
-    brain_id = os.getenv("SIGNAVIO_BRAIN_ID")
+    brain_id = SIGNAVIO_BRAIN_ID
     
     response = await call_brain_workflow_chat(
         brain_id,
@@ -126,7 +165,7 @@ async def get_signavio_bpmn_xml(data: dict, chat_history_id: Optional[str] = Non
     raw_text = response.get("result", "")
     extracted_xml = _extract_xml(raw_text)
 
-    if "<bpmn" not in extracted_xml.lower():
+    if not _BPMN_TAG_RE.search(extracted_xml):
         return {
             "error": True,
             "message": "Invalid BPMN response",
@@ -138,7 +177,7 @@ async def get_signavio_bpmn_xml(data: dict, chat_history_id: Optional[str] = Non
 
 async def analyze_process(data: dict, chat_history_id: Optional[str] = None) -> dict:
     """Get process analysis from Brain without generating XML."""
-    brain_id = os.getenv("SIGNAVIO_BRAIN_ID")
+    brain_id = SIGNAVIO_BRAIN_ID
     prompt = build_analysis_prompt(data)
     
     response = await call_brain_workflow_chat(
@@ -154,7 +193,7 @@ async def analyze_process(data: dict, chat_history_id: Optional[str] = None) ->
 
 async def continue_chat(chat_history_id: str, message: str, form_data: dict = None) -> dict:
     """Continue a Signavio BPMN chat conversation."""
-    brain_id = os.getenv("SIGNAVIO_BRAIN_ID")
+    brain_id = SIGNAVIO_BRAIN_ID
     
     prompt = message
     if form_data:
@@ -176,7 +215,7 @@ async def analyze_uploaded_bpmn(file: UploadFile) -> dict:
     
     Returns analysis with a bpmn_valid flag indicating if the content is BPMN-related.
     """
-    brain_id = os.getenv("SIGNAVIO_BRAIN_ID")
+    brain_id = SIGNAVIO_BRAIN_ID
 
     if not brain_id:
         return {
@@ -185,8 +224,8 @@ async def analyze_uploaded_bpmn(file: UploadFile) -> dict:
             "detail": "SIGNAVIO_BRAIN_ID is not configured.",
         }
 
-    # Create a chat history for this upload session
-    chat_result = await create_chat_history(brain_id)
+    # Create the chat history for this upload session and upload the file in parallel
+    chat_result, upload_result = await start_chat_turn(brain_id, [file])
     if chat_result.get("error"):
         return chat_result
 
@@ -198,8 +237,6 @@ async def analyze_uploaded_bpmn(file: UploadFile) -> dict:
             "detail": "Chat history ID is empty or null.",
         }
 
-    # Upload the file as an attachment
-    upload_result = await upload_attachments(brain_id, [file])
     if upload_result.get("error"):
         return upload_result
 
@@ -245,7 +282,7 @@ async def analyze_uploaded_bpmn(file: UploadFile) -> dict:
         document_valid = not has_invalid_signal
 
     # Strip the prefix tag from the displayed result
-    clean_result = re.sub(r'^\[(?:DOCUMENT_INVALID|DOCUMENT_VALID)\]\s*', '', stripped)
+    clean_result = _DOCUMENT_TAG_RE.sub('', stripped)
 
     return {
         "result": clean_result,
@@ -0,0 +1,86 @@
+"""Local XSUAA token validation fast path and its xssec fallback."""
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.services import auth_service
+
+UAA_URL = "https://tenant.authentication.eu10.hana.ondemand.com"
+CONFIG = {
+    "client_id": "sb-dscp-ai-apps!t123",
+    "xsappname": "dscp-ai-apps!t123",
+    "token_url": f"{UAA_URL}/oauth/token",
+    "identity_zone_id": "zone-1",
+}
+XSSEC_USER = {"user": "xssec-user", "email": "xssec@example.com", "scopes": []}
+
+
+@pytest.fixture
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def xssec_calls(monkeypatch, signing_key):
+    """Wire the fast path to a test key and record every xssec fallback."""
+    calls = []
+
+    def create_security_context(token, credentials):
+        calls.append(token)
+        return SimpleNamespace(
+            get_logon_name=lambda: XSSEC_USER["user"],
+            get_email=lambda: XSSEC_USER["email"],
+            get_granted_scopes=lambda: XSSEC_USER["scopes"],
+        )
+
+    monkeypatch.setattr(auth_service, "pyjwt", jwt)
+    monkeypatch.setattr(auth_service, "_token_keys", {"key-1": signing_key.public_key()})
+    monkeypatch.setattr(auth_service, "get_xsuaa_config", lambda: CONFIG)
+    monkeypatch.setattr(auth_service, "_get_uaa_service", lambda: SimpleNamespace(credentials={}))
+    monkeypatch.setattr(auth_service, "_load_sap_libs", lambda: True)
+    monkeypatch.setattr(
+        auth_service, "xssec", SimpleNamespace(create_security_context=create_security_context)
+    )
+    return calls
+
+
+def _token(signing_key, kid="key-1", **overrides):
+    claims = {
+        "user_name": "local-user",
+        "email": "local@example.com",
+        "scope": ["dscp-ai-apps!t123.Read"],
+        "aud": [CONFIG["client_id"]],
+        "iss": CONFIG["token_url"],
+        "zid": CONFIG["identity_zone_id"],
+        "exp": int(time.time()) + 600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, signing_key, algorithm="RS256", headers={"kid": kid})
+
+
+def test_valid_token_is_accepted_without_xssec(signing_key, xssec_calls):
+    user_info = auth_service.validate_token(_token(signing_key))
+
+    assert user_info["user"] == "local-user"
+    assert xssec_calls == []
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"aud": ["some-other-app!t999"]},
+        {"kid": "unknown-kid"},
+        {"iss": "https://other.authentication.eu10.hana.ondemand.com/oauth/token"},
+        {"zid": "zone-2"},
+    ],
+    ids=["wrong-audience", "unknown-kid", "wrong-issuer", "wrong-zone"],
+)
+def test_rejected_token_falls_back_to_xssec(signing_key, xssec_calls, overrides):
+    token = _token(signing_key, **overrides)
+
+    assert auth_service._validate_token_locally(token) is None
+    assert auth_service.validate_token(token) == XSSEC_USER
+    assert xssec_calls == [token]
@@ -0,0 +1,108 @@
+"""Brain client: concurrent attachment uploads and the retry policy."""
+import asyncio
+import io
+
+import httpx
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.services import common_service
+
+
+def _files(count):
+    return [UploadFile(io.BytesIO(b"data"), filename=f"f{i}.txt") for i in range(count)]
+
+
+def test_failed_upload_rewinds_every_file_before_raising(monkeypatch):
+    files = _files(3)
+    settled = []
+
+    async def upload_attachment(brain_id, file):
+        await file.read()
+        if file.filename == "f0.txt":
+            raise HTTPException(status_code=503, detail="token unavailable")
+        await asyncio.sleep(0.01)
+        settled.append(file.filename)
+        return {"attachmentIds": [file.filename]}
+
+    monkeypatch.setattr(common_service, "_upload_attachment", upload_attachment)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(common_service.upload_attachments("kb-1", files))
+
+    assert sorted(settled) == ["f1.txt", "f2.txt"]
+    assert all(file.file.tell() == 0 for file in files)
+
+
+def test_upload_ids_keep_input_order(monkeypatch):
+    async def upload_attachment(brain_id, file):
+        await asyncio.sleep(0.01 if file.filename == "f0.txt" else 0)
+        return {"attachmentIds": [file.filename]}
+
+    monkeypatch.setattr(common_service, "_upload_attachment", upload_attachment)
+
+    result = asyncio.run(common_service.upload_attachments("kb-1", _files(2)))
+
+    assert result == {"attachmentIds": ["f0.txt", "f1.txt"]}
+
+
+def _flaky_client(failure):
+    """A client whose first POST fails with ``failure`` and the next succeeds."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            if isinstance(failure, int):
+                return httpx.Response(failure, request=request)
+            raise failure("boom", request=request)
+        return httpx.Response(200, json=["att-1"], request=request)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), calls
+
+
+async def _access_token():
+    return "token"
+
+
+@pytest.mark.parametrize(
+    "call, failure, retried",
+    [
+        ("non-idempotent", 429, True),
+        ("non-idempotent", httpx.ConnectError, True),
+        ("non-idempotent", 502, False),
+        ("non-idempotent", 503, False),
+        ("non-idempotent", httpx.RemoteProtocolError, False),
+        ("idempotent", 502, True),
+        ("idempotent", httpx.RemoteProtocolError, True),
+        ("upload", 429, True),
+        ("upload", httpx.ConnectTimeout, True),
+        ("upload", 503, False),
+        ("upload", httpx.RemoteProtocolError, False),
+    ],
+)
+def test_non_idempotent_posts_only_retry_before_reaching_the_backend(
+    monkeypatch, call, failure, retried
+):
+    monkeypatch.setattr(common_service, "_retry_delay", lambda attempt, response=None: 0)
+    client, calls = _flaky_client(failure)
+    monkeypatch.setattr(common_service, "get_brain_access_token", _access_token)
+    monkeypatch.setattr(common_service, "get_brain_client", lambda: client)
+
+    async def post():
+        async with client:
+            if call == "upload":
+                return await common_service._upload_attachment("kb-1", _files(1)[0])
+            return await common_service._post_with_retry(
+                client, "https://brain.example/chat", idempotent=call == "idempotent"
+            )
+
+    if call == "upload":
+        expected = {"attachmentIds": ["att-1"]} if retried else {"error": True}
+        assert expected.items() <= asyncio.run(post()).items()
+    elif retried:
+        assert asyncio.run(post()).status_code == 200
+    else:
+        with pytest.raises((httpx.HTTPStatusError, httpx.RemoteProtocolError)):
+            asyncio.run(post())
+    assert len(calls) == (2 if retried else 1)